@@ -0,0 +1,63 @@
+#!/usr/bin/env python
+"""
+Micro-benchmark of Garc.format_post against the BeautifulSoup extraction it
+replaced, in posts per second over the statuses in fixtures/statuses.jsonl
+(or any JSON lines file of statuses given as the first argument).
+
+    python benchmarks/format_post.py [statuses.jsonl] [--repeat N]
+"""
+import os
+import sys
+import json
+import html
+import time
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from bs4 import BeautifulSoup
+from garc.client import Garc
+from garc.text import html_to_text
+
+FIXTURE = os.path.join(os.path.dirname(__file__), 'fixtures', 'statuses.jsonl')
+
+
+def legacy_format_post(post):
+    post['body'] = BeautifulSoup(html.unescape(post['content']), features="html.parser").get_text()
+    return post
+
+
+def rate(format_post, posts, repeat, clear_cache):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        if clear_cache:
+            html_to_text.cache_clear()
+        for post in posts:
+            format_post(post)
+    return len(posts) * repeat / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('statuses', nargs='?', default=FIXTURE)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    with open(args.statuses) as fh:
+        posts = [json.loads(line) for line in fh if line.strip()]
+
+    g = Garc(config=os.devnull)
+    for post in posts:
+        expected = legacy_format_post(dict(post))['body']
+        html_to_text.cache_clear()
+        if g.format_post(dict(post))['body'] != expected:
+            sys.exit("body of %s differs from BeautifulSoup" % post['id'])
+
+    print("%d statuses x %d" % (len(posts), args.repeat))
+    print("beautifulsoup:     %10.0f posts/s" % rate(legacy_format_post, posts, args.repeat, False))
+    print("html_to_text:      %10.0f posts/s" % rate(g.format_post, posts, args.repeat, True))
+    print("html_to_text+cache:%10.0f posts/s" % rate(g.format_post, posts, args.repeat, False))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+"""
+Startup cost of garc commands that don't touch the network, from
+python -X importtime: the milliseconds spent importing garc and what it
+imports, the heavy modules that were loaded, and the wall clock time of
+the whole process over a bare interpreter. Exits with 1 when a command
+imports for longer than its target.
+
+    python benchmarks/importtime.py [--repeat 5]
+"""
+import os
+import re
+import sys
+import time
+import argparse
+import tempfile
+import subprocess
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+# modules that only the commands sending requests or writing to databases need
+HEAVY = ['requests', 'urllib3', 'asyncio', 'sqlite3', 'pyarrow', 'dateutil', 'http.server',
+         'orjson', 'zstandard', 'gzip', 'csv']
+
+RUN = """
+import sys
+sys.argv = %r
+from garc import main
+try:
+    main()
+except (SystemExit, EOFError):
+    # configure stops at its first prompt, stdin is empty
+    pass
+"""
+
+# scenario: (code, target in ms of import time)
+SCENARIOS = [
+    ('garc version', RUN % ['garc', 'version'], 25),
+    ('garc help', RUN % ['garc', 'help'], 25),
+    ('garc configure', RUN % ['garc', 'configure', '--config', '/nonexistent'], 40),
+    ('import garc', 'import garc', 5),
+    # what garc configure and user_agent load before prompting
+    ('Garc()', 'from garc import Garc; Garc(user_account="a", user_password="b", config="/nonexistent")', 40),
+]
+
+LINE = re.compile(r'import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)')
+
+
+def importtime(code):
+    """
+    The microseconds spent in the top level imports of garc modules, the
+    heavy modules imported, and the wall clock seconds of the process.
+    """
+    loaded = HEAVY + ['garc']
+    started = time.time()
+    code = 'import sys\n%s\nprint("\\nloaded:", *[m for m in %r if m in sys.modules])' % (code, HEAVY)
+    # run elsewhere so that garc.log isn't left behind
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', code],
+                          cwd=tempfile.gettempdir(), env=dict(os.environ, PYTHONPATH=ROOT),
+                          stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                          universal_newlines=True)
+    elapsed = time.time() - started
+    total = 0
+    for line in proc.stderr.splitlines():
+        m = LINE.match(line)
+        if m and not m.group(3) and m.group(4).split('.')[0] in loaded:
+            total += int(m.group(2))
+    heavy = [line.split()[1:] for line in proc.stdout.splitlines() if line.startswith('loaded:')]
+    if not heavy:
+        raise RuntimeError(proc.stderr)
+    return total, heavy[0], elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    bare = min(importtime('import sys')[2] for i in range(args.repeat))
+    failed = False
+    for name, code, target in SCENARIOS:
+        runs = [importtime(code) for i in range(args.repeat)]
+        imports = min(r[0] for r in runs) / 1000.0
+        wall = min(r[2] for r in runs) - bare
+        heavy = runs[0][1]
+        ok = imports <= target
+        failed = failed or not ok
+        print("%-15s %6.1f ms imports (target %s ms) %s  +%5.1f ms over python  heavy: %s" % (
+            name, imports, target, 'ok  ' if ok else 'SLOW', wall * 1000, ', '.join(heavy) or '-'))
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,225 @@
+#!/usr/bin/env python
+"""
+A local stand-in for the Gab (Mastodon) API for benchmarks. It replays the
+statuses in fixtures/statuses.jsonl as timelines of any length, serving
+timelines/tag, timelines/public, timelines/explore, accounts/:id/statuses,
+account_by_username, accounts/:id, accounts?id[]= and the auth/sign_in page, and can add latency, 429s
+and 500s to API responses.
+
+    python benchmarks/mock_server.py [--port 8000] [--size 4000] [--latency 0.05]
+                                     [--error_rate 0.01] [--rate_limit_rate 0.01]
+
+and point garc at it with --base_url http://127.0.0.1:8000
+"""
+import os
+import re
+import sys
+import json
+import time
+import zlib
+import random
+import bisect
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+FIXTURE = os.path.join(os.path.dirname(__file__), 'fixtures', 'statuses.jsonl')
+
+SIGN_IN = b"""<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>Gab</title>
+<meta name="csrf-param" content="authenticity_token">
+<meta name="csrf-token" content="bench+token/0123456789==">
+</head><body>""" + b"<div>sign in</div>" * 2000 + b"</body></html>"
+
+
+def read_statuses(path=FIXTURE):
+    with open(path) as fh:
+        return [json.loads(line) for line in fh if line.strip()]
+
+
+class Timeline(object):
+    """
+    size statuses made from the recorded ones, newest first, one every
+    interval seconds up to now, with Mastodon ids matching their times.
+    """
+
+    def __init__(self, statuses, size, interval=5):
+        now = time.time()
+        self.statuses = []
+        for i in range(size):
+            created = now - i * interval
+            status = dict(statuses[i % len(statuses)])
+            status['id'] = str((int(created * 1000) << 16) + i % 65536)
+            status['created_at'] = time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(created)) + \
+                '.%03dZ' % (int(created * 1000) % 1000)
+            self.statuses.append(status)
+        # negated so that bisect works on the descending ids
+        self.ids = [-int(s['id']) for s in self.statuses]
+
+    def page(self, max_id=None, min_id=None, limit=20):
+        if min_id:
+            end = bisect.bisect_left(self.ids, -int(min_id))
+            return self.statuses[max(0, end - limit):end]
+        start = bisect.bisect_right(self.ids, -int(max_id)) if max_id else 0
+        return self.statuses[start:start + limit]
+
+
+class MockGab(ThreadingHTTPServer):
+    """
+    The mock server, counting the requests it answers and the errors it
+    injects.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address, statuses, size=4000, latency=0, error_rate=0,
+                 rate_limit_rate=0, seed=0):
+        ThreadingHTTPServer.__init__(self, address, Handler)
+        self.timeline = Timeline(statuses, size)
+        self.latency = latency
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+        self.accounts = {}
+
+    def account(self, username):
+        """
+        The account of a username, the same one every time.
+        """
+        account_id = str(zlib.crc32(username.lower().encode('utf8')))
+        account = dict(self.timeline.statuses[0]['account'], id=account_id,
+                       username=username, acct=username)
+        with self.lock:
+            self.accounts[account_id] = account
+        return account
+
+    @property
+    def url(self):
+        return 'http://%s:%s' % self.server_address[:2]
+
+    def inject(self):
+        """
+        The status code of an injected error, or None.
+        """
+        with self.lock:
+            self.requests += 1
+            roll = self.random.random()
+            if roll < self.rate_limit_rate:
+                self.errors += 1
+                return 429
+            if roll < self.rate_limit_rate + self.error_rate:
+                self.errors += 1
+                return 500
+        return None
+
+    def handle_error(self, request, client_address):
+        # clients closing their keep-alive connections aren't errors
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            ThreadingHTTPServer.handle_error(self, request, client_address)
+
+
+class Handler(BaseHTTPRequestHandler):
+
+    protocol_version = 'HTTP/1.1'
+    # headers and body go out in separate writes, which with Nagle and
+    # delayed acks would add 40ms to every response
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def send(self, status, body=b'', content_type='application/json; charset=utf-8', headers=()):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        self.rfile.read(length)
+        if urlparse(self.path).path == '/auth/sign_in':
+            self.send(200, b'{}', headers=[('Set-Cookie', '_session_id=bench; path=/')])
+        else:
+            self.send(404, b'{"error": "Not found"}')
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = dict((k, v[0]) for k, v in parse_qs(url.query).items())
+        if url.path == '/auth/sign_in':
+            return self.send(200, SIGN_IN, 'text/html; charset=utf-8',
+                             [('Set-Cookie', '_gab_session=bench; path=/')])
+
+        server = self.server
+        if server.latency:
+            time.sleep(server.latency)
+        error = server.inject()
+        if error == 429:
+            return self.send(429, b'{"error": "Too many requests"}',
+                             headers=[('Retry-After', '0.05')])
+        if error:
+            return self.send(500, b'{"error": "Internal server error"}')
+
+        limit = int(query.get('limit') or 20)
+        m = re.match(r'/api/v1/account_by_username/(\w+)$', url.path)
+        if m:
+            return self.send(200, json.dumps(server.account(m.group(1))).encode('utf8'))
+        m = re.match(r'/api/v1/accounts/(\d+)$', url.path)
+        if m and m.group(1) in server.accounts:
+            return self.send(200, json.dumps(server.accounts[m.group(1)]).encode('utf8'))
+        if url.path == '/api/v1/accounts':
+            ids = parse_qs(url.query).get('id[]', [])
+            body = [server.accounts[i] for i in ids if i in server.accounts]
+            return self.send(200, json.dumps(body).encode('utf8'))
+        if url.path == '/api/v1/timelines/explore':
+            body = server.timeline.statuses[:15]
+        elif (url.path == '/api/v1/timelines/public'
+              or re.match(r'/api/v1/timelines/tag/\w+$', url.path)
+              or re.match(r'/api/v1/accounts/\d+/statuses$', url.path)):
+            body = server.timeline.page(query.get('max_id'), query.get('min_id'), limit)
+        else:
+            return self.send(404, b'{"error": "Not found"}')
+        self.send(200, json.dumps(body).encode('utf8'))
+
+
+def serve(port=0, ready=None, **kwargs):
+    """
+    Run a MockGab until the process is stopped, putting its url on the
+    ready queue once it is listening.
+    """
+    server = MockGab(('127.0.0.1', port), read_statuses(), **kwargs)
+    if ready is not None:
+        ready.put(server.url)
+    server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--size', type=int, default=4000,
+                        help="number of statuses in every timeline")
+    parser.add_argument('--latency', type=float, default=0,
+                        help="seconds added to every API response")
+    parser.add_argument('--error_rate', type=float, default=0,
+                        help="fraction of API requests answered with a 500")
+    parser.add_argument('--rate_limit_rate', type=float, default=0,
+                        help="fraction of API requests answered with a 429")
+    args = parser.parse_args()
+    server = MockGab(('127.0.0.1', args.port), read_statuses(), size=args.size,
+                     latency=args.latency, error_rate=args.error_rate,
+                     rate_limit_rate=args.rate_limit_rate)
+    print("serving %s statuses per timeline on %s" % (args.size, server.url), file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+"""
+Throughput of the CLI output stage in items per second: the old
+print(json.dumps()) through codecs.open with a log line per item, against
+garc.output writers with and without compression, the csv and parquet
+(when pyarrow is installed) writers, and gabs cut down to a few fields
+as with --fields.
+
+    python benchmarks/output.py [statuses.jsonl] [--items N]
+"""
+import os
+import sys
+import json
+import time
+import codecs
+import logging
+import argparse
+import tempfile
+import importlib.util
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from garc.output import open_writer
+from garc.record import record_type
+
+FIXTURE = os.path.join(os.path.dirname(__file__), 'fixtures', 'statuses.jsonl')
+
+
+def legacy(posts, path):
+    fh = codecs.open(path, 'wb', 'utf8')
+    for thing in posts:
+        print(json.dumps(thing), file=fh)
+        logging.info("archived %s", thing['id'])
+    fh.close()
+
+
+def writer(posts, path, format='json', **kwargs):
+    out = open_writer(format, path, **kwargs)
+    for thing in posts:
+        out.write(thing)
+    out.close()
+
+
+def projected(posts, path, fields):
+    # as with --fields, each status is cut down to a record before writing
+    record = record_type(fields)
+    out = open_writer('json', path)
+    for thing in posts:
+        out.write(record.from_status(thing))
+    out.close()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('statuses', nargs='?', default=FIXTURE)
+    parser.add_argument('--items', type=int, default=50000)
+    args = parser.parse_args()
+
+    with open(args.statuses) as fh:
+        corpus = [json.loads(line) for line in fh if line.strip()]
+    posts = [corpus[i % len(corpus)] for i in range(args.items)]
+
+    tmp = tempfile.mkdtemp()
+    logging.basicConfig(filename=os.path.join(tmp, 'garc.log'), level=logging.INFO,
+                        format="%(asctime)s %(levelname)s %(message)s")
+    runs = [
+        ('print + codecs + log', legacy, 'legacy.json', {}),
+        ('json writer', writer, 'posts.json', {}),
+        ('json writer + gzip', writer, 'posts.json.gz', {}),
+        ('json writer + rotation', writer, 'rotated.json', {'rotate_items': 10000}),
+        ('csv writer', writer, 'posts.csv', {'format': 'csv'}),
+        ('json writer, 4 fields', projected, 'fields.json',
+         {'fields': ['id', 'created_at', 'account.acct', 'content']})
+    ]
+    if importlib.util.find_spec('pyarrow') is not None:
+        runs.append(('parquet writer', writer, 'posts.parquet', {'format': 'parquet'}))
+    print("%d items" % len(posts))
+    for name, run, filename, kwargs in runs:
+        start = time.perf_counter()
+        run(posts, os.path.join(tmp, filename), **kwargs)
+        rate = len(posts) / (time.perf_counter() - start)
+        size = os.path.getsize(os.path.join(tmp, filename))
+        print("%-24s %10.0f items/s %8.1f MB" % (name, rate, size / 1024.0 ** 2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,189 @@
+#!/usr/bin/env python
+"""
+End to end benchmarks of the collection commands against the local mock
+server in mock_server.py, so that changes to paging, retries, parsing and
+output can be compared without touching gab.com. Every scenario runs in a
+fresh process and reports pages and gabs per second, the p50 and p99
+request latency and the peak memory of the process.
+
+    python benchmarks/suite.py [--size 4000] [--latency 0.01] [--error_rate 0]
+                               [--rate_limit_rate 0] [--only search,cli]
+                               [--json results.json]
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import resource
+import tempfile
+import multiprocessing
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import mock_server
+
+CONFIG = """[main]
+user_account = bench@example.com
+user_password = bench
+"""
+
+
+def new_garc(url, workdir):
+    """
+    A Garc for the mock server, with the latency of every response
+    collected in garc.latencies.
+    """
+    from garc.client import Garc
+    config = os.path.join(workdir, 'garc.ini')
+    with open(config, 'w') as fh:
+        fh.write(CONFIG)
+    garc = Garc(config=config, base_url=url)
+    garc.latencies = []
+
+    def hook(r, *args, **kwargs):
+        garc.latencies.append(r.elapsed.total_seconds())
+
+    garc.session.hooks['response'].append(hook)
+    return garc
+
+
+def oldest(size):
+    # the mock timeline has a status every 5 seconds up to now
+    return time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(time.time() - size * 5 - 60))
+
+
+def search(url, workdir, size):
+    garc = new_garc(url, workdir)
+    return sum(1 for post in garc.search('bench')), garc.latencies
+
+
+def userposts(url, workdir, size):
+    garc = new_garc(url, workdir)
+    return sum(1 for post in garc.userposts('bench')), garc.latencies
+
+
+def public_search(url, workdir, size):
+    garc = new_garc(url, workdir)
+    # the fixture statuses are in English, most of them have a "the"
+    posts = garc.public_search('the', gabs_after=oldest(size))
+    return sum(1 for post in posts), garc.latencies
+
+
+def format_post(url, workdir, size):
+    garc = new_garc(url, workdir)
+    statuses = mock_server.read_statuses()
+    for i in range(size):
+        garc.format_post(dict(statuses[i % len(statuses)]))
+    return size, []
+
+
+def cli(url, workdir, size):
+    from garc import command, session
+    latencies = []
+    new_session = session.new_session
+
+    def timed_session(*args, **kwargs):
+        s = new_session(*args, **kwargs)
+        s.hooks['response'].append(lambda r, *a, **k: latencies.append(r.elapsed.total_seconds()))
+        return s
+
+    session.new_session = timed_session
+    config = os.path.join(workdir, 'garc.ini')
+    with open(config, 'w') as fh:
+        fh.write(CONFIG)
+    output = os.path.join(workdir, 'search.jsonl')
+    sys.argv = ['garc', 'search', 'bench', '--base_url', url, '--config', config,
+                '--output', output, '--no_item_log', '--log', os.path.join(workdir, 'garc.log')]
+    command.main()
+    with open(output, 'rb') as fh:
+        return sum(1 for line in fh), latencies
+
+
+SCENARIOS = [search, userposts, public_search, format_post, cli]
+
+
+def run_scenario(name, url, size, results):
+    workdir = tempfile.mkdtemp()
+    try:
+        started = time.time()
+        posts, latencies = globals()[name](url, workdir, size)
+        elapsed = time.time() - started
+    finally:
+        shutil.rmtree(workdir)
+    latencies.sort()
+    results.put({
+        'scenario': name,
+        'seconds': round(elapsed, 3),
+        'pages': len(latencies),
+        'pages_per_second': round(len(latencies) / elapsed, 1),
+        'gabs': posts,
+        'gabs_per_second': round(posts / elapsed, 1),
+        'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 2),
+        # ru_maxrss is in kilobytes on Linux
+        'peak_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0, 1)
+    })
+
+
+def percentile(values, p):
+    if not values:
+        return 0
+    return values[min(len(values) - 1, int(len(values) * p / 100.0))]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--size', type=int, default=4000,
+                        help="number of statuses in every mock timeline")
+    parser.add_argument('--latency', type=float, default=0.01,
+                        help="seconds the mock server adds to every API response")
+    parser.add_argument('--error_rate', type=float, default=0,
+                        help="fraction of API requests answered with a 500")
+    parser.add_argument('--rate_limit_rate', type=float, default=0,
+                        help="fraction of API requests answered with a 429")
+    parser.add_argument('--only', default=None,
+                        help="comma separated scenarios to run")
+    parser.add_argument('--json', default=None,
+                        help="write the results to this JSON file")
+    args = parser.parse_args()
+
+    names = [s.__name__ for s in SCENARIOS]
+    if args.only:
+        names = [n for n in names if n in args.only.split(',')]
+
+    # separate processes so that the server doesn't compete with the
+    # client for the GIL, and every scenario starts with a clean heap
+    spawn = multiprocessing.get_context('spawn')
+    ready = spawn.Queue()
+    server = spawn.Process(target=mock_server.serve, kwargs={
+        'ready': ready, 'size': args.size, 'latency': args.latency,
+        'error_rate': args.error_rate, 'rate_limit_rate': args.rate_limit_rate})
+    server.daemon = True
+    server.start()
+    url = ready.get(timeout=60)
+
+    rows = []
+    try:
+        for name in names:
+            results = spawn.Queue()
+            p = spawn.Process(target=run_scenario, args=(name, url, args.size, results))
+            p.start()
+            row = results.get()
+            p.join()
+            rows.append(row)
+            print("%-14s %8.1f pages/s %9.1f gabs/s  p50 %7.2f ms  p99 %7.2f ms  %6.1f MB" % (
+                name, row['pages_per_second'], row['gabs_per_second'],
+                row['p50_ms'], row['p99_ms'], row['peak_rss_mb']))
+    finally:
+        server.terminate()
+
+    if args.json:
+        with open(args.json, 'w') as fh:
+            json.dump({'size': args.size, 'latency': args.latency, 'error_rate': args.error_rate,
+                       'rate_limit_rate': args.rate_limit_rate, 'results': rows}, fh, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,4 +1,15 @@
 __version__ = '0.9.9'  # also in setup.py
 
-from .client import Garc
-from .command import main
\ No newline at end of file
+__all__ = ['Garc', 'main']
+
+
+def __getattr__(name):
+    # Garc and main are imported on first use, so that importing garc (or
+    # running garc version) doesn't load the whole client
+    if name == 'Garc':
+        from .client import Garc
+        return Garc
+    if name == 'main':
+        from .command import main
+        return main
+    raise AttributeError("module %r has no attribute %r" % (__name__, name))
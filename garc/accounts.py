@@ -0,0 +1,177 @@
+"""
+Resolve many usernames to accounts at once, with a persistent cache.
+"""
+import json
+import time
+import sqlite3
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS accounts (
+    username TEXT PRIMARY KEY COLLATE NOCASE,
+    id TEXT,
+    json TEXT,
+    fetched_at REAL
+);
+"""
+
+# how many ids /api/v1/accounts accepts in one request
+BATCH_SIZE = 40
+
+
+class AccountCache(object):
+    """
+    The accounts of usernames looked up before, kept in a SQLite file (in
+    memory by default) for ttl seconds, so that a username is only
+    resolved to its id once however many commands and runs use it.
+    """
+
+    def __init__(self, path=':memory:', ttl=7 * 24 * 3600):
+        self.path = path
+        self.ttl = ttl
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.executescript(SCHEMA)
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, username):
+        """
+        The cached account of username, None if unknown or expired.
+        """
+        with self.lock:
+            row = self.db.execute('SELECT json FROM accounts WHERE username = ? AND fetched_at > ?',
+                                  (username, time.time() - self.ttl)).fetchone()
+            if row:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return json.loads(row[0]) if row else None
+
+    def put(self, accounts):
+        """
+        Cache a list of accounts by their usernames.
+        """
+        now = time.time()
+        with self.lock:
+            self.db.executemany('INSERT OR REPLACE INTO accounts VALUES (?, ?, ?, ?)',
+                                [(a['username'], str(a['id']), json.dumps(a), now)
+                                 for a in accounts])
+            self.db.commit()
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses}
+
+    def close(self):
+        self.db.close()
+
+
+class AccountResolver(object):
+    """
+    Look up the accounts of many usernames with concurrency requests at
+    a time. Usernames in the AccountCache of the Garc are not looked up
+    again by name: their profiles are refreshed BATCH_SIZE at a time with
+    /api/v1/accounts?id[]=, falling back to one request per id on servers
+    without that endpoint.
+    """
+
+    def __init__(self, garc, concurrency=8, chunk_size=1000):
+        self.garc = garc
+        self.concurrency = concurrency
+        self.chunk_size = chunk_size
+        self.batches = True
+
+    def by_username(self, username):
+        """
+        The account of a username, None if there is no such account.
+        """
+        resp = self.garc.get(self.garc.base_url + '/api/v1/account_by_username/%s' % username)
+        if resp.status_code != 200:
+            logging.error("no account %s, recieved %s from Gab.com", username, resp.status_code)
+            return None
+        return resp.json()
+
+    def by_id(self, account_id):
+        resp = self.garc.get(self.garc.base_url + '/api/v1/accounts/%s' % account_id)
+        if resp.status_code != 200:
+            logging.error("no account %s, recieved %s from Gab.com", account_id, resp.status_code)
+            return None
+        return resp.json()
+
+    def by_ids(self, ids):
+        """
+        The accounts of a batch of ids, in one request when the server
+        supports it.
+        """
+        if self.batches:
+            url = self.garc.base_url + '/api/v1/accounts?' + '&'.join('id[]=%s' % i for i in ids)
+            resp = self.garc.get(url)
+            if resp.status_code == 200:
+                return resp.json()
+            logging.warn("batch account lookup unavailable, recieved %s from Gab.com, "
+                         "looking up accounts one at a time", resp.status_code)
+            self.batches = False
+        return [a for a in map(self.by_id, ids) if a]
+
+    def resolve(self, usernames):
+        """
+        A dictionary of the account ids of usernames, from the cache or
+        looked up concurrently, or given as id:<id>. Unknown usernames are
+        left out.
+        """
+        ids = {}
+        missing = []
+        for username in usernames:
+            if username.startswith('id:'):
+                ids[username] = username[3:]
+                continue
+            account = self.garc.accounts.get(username)
+            if account:
+                ids[username] = str(account['id'])
+            else:
+                missing.append(username)
+        if missing:
+            logging.info("resolving %s usernames, %s were cached", len(missing), len(ids))
+        with ThreadPoolExecutor(self.concurrency) as executor:
+            for username, account in zip(missing, executor.map(self.by_username, missing)):
+                if account:
+                    self.garc.accounts.put([account])
+                    ids[username] = str(account['id'])
+        return ids
+
+    def lookup(self, usernames):
+        """
+        Generator of the current accounts of usernames, or ids given as
+        id:<id>, in order, chunk_size usernames at a time.
+        """
+        with ThreadPoolExecutor(self.concurrency) as executor:
+            for start in range(0, len(usernames), self.chunk_size):
+                chunk = usernames[start:start + self.chunk_size]
+                accounts = {}
+                cached = {}
+                missing = []
+                for username in chunk:
+                    # ids given as id:<id> are looked up with the cached ones
+                    if username.startswith('id:'):
+                        cached.setdefault(username[3:], []).append(username)
+                        continue
+                    account = self.garc.accounts.get(username)
+                    if account:
+                        cached.setdefault(str(account['id']), []).append(username)
+                    else:
+                        missing.append(username)
+                ids = list(cached)
+                batches = [ids[i:i + BATCH_SIZE] for i in range(0, len(ids), BATCH_SIZE)]
+                for batch in executor.map(self.by_ids, batches):
+                    for account in batch:
+                        for username in cached.get(str(account['id']), [account['username']]):
+                            accounts[username] = account
+                for username, account in zip(missing, executor.map(self.by_username, missing)):
+                    if account:
+                        accounts[username] = account
+                self.garc.accounts.put(list(accounts.values()))
+                for username in chunk:
+                    if username in accounts:
+                        yield accounts[username]
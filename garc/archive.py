@@ -0,0 +1,142 @@
+"""
+A local SQLite archive of collected gabs that can be queried offline.
+"""
+import json
+import sqlite3
+import logging
+
+from .output import encode_json
+from .text import html_to_text
+from .window import TimeWindow
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS statuses (
+    id INTEGER PRIMARY KEY,
+    account_id INTEGER,
+    acct TEXT COLLATE NOCASE,
+    created_at TEXT,
+    body TEXT,
+    json TEXT
+);
+CREATE INDEX IF NOT EXISTS statuses_account ON statuses (account_id, created_at);
+CREATE INDEX IF NOT EXISTS statuses_acct ON statuses (acct, created_at);
+CREATE INDEX IF NOT EXISTS statuses_created_at ON statuses (created_at);
+CREATE TABLE IF NOT EXISTS tags (
+    tag TEXT,
+    status_id INTEGER,
+    PRIMARY KEY (tag, status_id)
+) WITHOUT ROWID;
+CREATE VIRTUAL TABLE IF NOT EXISTS statuses_fts USING fts5 (
+    body, content='statuses', content_rowid='id'
+);
+"""
+
+
+class Archive(object):
+    """
+    Gabs kept in a SQLite database, with indexes on their id, account,
+    creation time and tags and a full text index of their body, so that
+    collected gabs can be looked up again without the API or rescanning
+    the JSON files they were written to.
+
+    Gabs are added in transactions of batch_size. A gab that is already
+    in the archive is left as it is.
+    """
+
+    def __init__(self, path, batch_size=1000):
+        self.path = path
+        self.batch_size = batch_size
+        self.db = sqlite3.connect(path)
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.execute('PRAGMA synchronous=NORMAL')
+        self.db.executescript(SCHEMA)
+        self.pending = 0
+        self.added = 0
+
+    def write(self, status):
+        """
+        Add a status to the archive, items that aren't statuses are ignored.
+        """
+        account = status.get('account')
+        if 'content' not in status or not isinstance(account, dict):
+            return
+        try:
+            status_id = int(status['id'])
+        except (KeyError, TypeError, ValueError):
+            return
+        # top returns the statuses as Gab sends them, without a body
+        body = status.get('body')
+        if body is None:
+            body = html_to_text(status['content'] or '')
+        cursor = self.db.execute(
+            'INSERT OR IGNORE INTO statuses (id, account_id, acct, created_at, body, json) '
+            'VALUES (?, ?, ?, ?, ?, ?)',
+            (status_id, account.get('id'), account.get('acct'), status.get('created_at'),
+             body, encode_json(status).decode('utf8')))
+        if cursor.rowcount:
+            self.db.execute('INSERT INTO statuses_fts (rowid, body) VALUES (?, ?)',
+                            (status_id, body))
+            self.db.executemany('INSERT OR IGNORE INTO tags (tag, status_id) VALUES (?, ?)',
+                                [(tag['name'].lower(), status_id)
+                                 for tag in status.get('tags') or [] if tag.get('name')])
+            self.added += 1
+        self.pending += 1
+        if self.pending >= self.batch_size:
+            self.commit()
+
+    def commit(self):
+        self.db.commit()
+        self.pending = 0
+
+    def close(self):
+        self.commit()
+        self.db.close()
+        logging.info("added %s gabs to %s", self.added, self.path)
+
+    def query(self, text=None, account=None, tag=None, after=None, before=None, limit=-1):
+        """
+        Generator of the archived statuses, newest first, whose body
+        matches the FTS5 query text, posted by account (an acct or an
+        account id), with tag, and created from after up to before.
+        Raises ValueError if text isn't a valid FTS5 query.
+        """
+        if text:
+            try:
+                self.db.execute('SELECT rowid FROM statuses_fts WHERE statuses_fts MATCH ? LIMIT 1',
+                                (text,)).fetchall()
+            except sqlite3.OperationalError as e:
+                raise ValueError('invalid query %r (%s), put terms with punctuation in double '
+                                 'quotes, e.g. \'"right-wing"\'' % (text, e))
+        window = TimeWindow(after, before)
+        tables = ['statuses']
+        where = []
+        params = []
+        if text:
+            tables.append('statuses_fts')
+            where.append('statuses_fts.rowid = statuses.id AND statuses_fts MATCH ?')
+            params.append(text)
+        if account:
+            account = account.lstrip('@')
+            if account.isdigit():
+                where.append('(statuses.account_id = ? OR statuses.acct = ?)')
+                params.extend([int(account), account])
+            else:
+                where.append('statuses.acct = ?')
+                params.append(account)
+        if tag:
+            tables.append('tags')
+            where.append('tags.status_id = statuses.id AND tags.tag = ?')
+            params.append(tag.lstrip('#').lower())
+        if window.after_text:
+            where.append('statuses.created_at >= ?')
+            params.append(window.after_text)
+        if window.before_text:
+            where.append('statuses.created_at < ?')
+            params.append(window.before_text)
+        sql = 'SELECT statuses.json FROM %s' % ', '.join(tables)
+        if where:
+            sql += ' WHERE ' + ' AND '.join(where)
+        sql += ' ORDER BY statuses.id DESC LIMIT ?'
+        params.append(limit)
+        for row in self.db.execute(sql, params):
+            yield json.loads(row[0])
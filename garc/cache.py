@@ -0,0 +1,175 @@
+"""
+An on-disk cache of API responses, revalidated with ETags.
+"""
+import re
+import json
+import time
+import sqlite3
+import logging
+import threading
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+# how long responses from each kind of endpoint stay fresh, in seconds, by
+# the first pattern that matches the url. Responses with a ttl of 0 are
+# kept only to be revalidated, urls that match nothing aren't cached.
+TTLS = [
+    (r'/api/v1/account_by_username/', 24 * 3600),
+    (r'/api/v1/accounts/\d+$', 24 * 3600),
+    (r'/api/v1/timelines/explore', 10 * 60),
+    # older pages of a timeline hardly change, the newest page does
+    (r'/api/v1/(timelines|accounts)/.*max_id=\d', 3600),
+    (r'/api/v1/(timelines|accounts)/', 0)
+]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    headers TEXT,
+    body BLOB,
+    stored_at REAL,
+    accessed_at REAL,
+    size INTEGER
+);
+CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at);
+"""
+
+
+class ResponseCache(object):
+    """
+    Successful responses stored in a SQLite file. A response is served
+    from the cache while it is fresh according to the ttl of its endpoint
+    (see TTLS). After that the request is made again with If-None-Match
+    and If-Modified-Since, and a 304 Not Modified from the server is
+    answered with the cached body.
+
+    When the bodies stored add up to more than max_size bytes the least
+    recently used responses are dropped.
+    """
+
+    def __init__(self, path, max_size=100 * 1024 ** 2, ttls=TTLS):
+        self.path = path
+        self.max_size = max_size
+        self.ttls = [(re.compile(pattern), ttl) for pattern, ttl in ttls]
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.executescript(SCHEMA)
+        self.lock = threading.Lock()
+        self.size = self.db.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+
+    def ttl(self, url):
+        """
+        How long the response to url stays fresh, None if it isn't cached.
+        """
+        for pattern, ttl in self.ttls:
+            if pattern.search(url):
+                return ttl
+        return None
+
+    def lookup(self, key):
+        """
+        The (response, fresh) of a cached request, or (None, False).
+        """
+        with self.lock:
+            row = self.db.execute('SELECT headers, body, stored_at FROM responses WHERE key = ?',
+                                  (key,)).fetchone()
+            if not row:
+                return None, False
+            now = time.time()
+            self.db.execute('UPDATE responses SET accessed_at = ? WHERE key = ?', (now, key))
+            self.db.commit()
+        headers, body, stored_at = row
+        url = key.split(' ', 1)[1]
+        fresh = stored_at + self.ttl(url) > now
+        return cached_response(url, json.loads(headers), body), fresh
+
+    def store(self, key, response):
+        """
+        Cache a successful response.
+        """
+        headers = json.dumps(dict(response.headers))
+        body = response.content
+        now = time.time()
+        with self.lock:
+            old = self.db.execute('SELECT size FROM responses WHERE key = ?', (key,)).fetchone()
+            self.size += len(body) - (old[0] if old else 0)
+            self.db.execute('INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)',
+                            (key, headers, body, now, now, len(body)))
+            if self.size > self.max_size:
+                self.evict()
+            self.db.commit()
+
+    def refresh(self, key):
+        """
+        Mark a cached response as fresh again after a 304.
+        """
+        with self.lock:
+            self.db.execute('UPDATE responses SET stored_at = ? WHERE key = ?', (time.time(), key))
+            self.db.commit()
+
+    def evict(self):
+        """
+        Drop the least recently used responses until the cache is back
+        under 90% of max_size.
+        """
+        rows = self.db.execute('SELECT key, size FROM responses ORDER BY accessed_at')
+        keys = []
+        for key, size in rows:
+            if self.size <= self.max_size * 0.9:
+                break
+            keys.append((key,))
+            self.size -= size
+        self.db.executemany('DELETE FROM responses WHERE key = ?', keys)
+        logging.info("evicted %s responses from %s", len(keys), self.path)
+
+    def fetch(self, url, get, authenticated=False):
+        """
+        Respond to url from the cache, calling get(headers) with any extra
+        request headers when the network is needed.
+        """
+        ttl = self.ttl(url)
+        if ttl is None:
+            return get({})
+        key = '%s %s' % ('auth' if authenticated else 'anon', url)
+        cached, fresh = self.lookup(key)
+        if fresh:
+            self.hits += 1
+            return cached
+        headers = {}
+        if cached is not None:
+            if 'ETag' in cached.headers:
+                headers['If-None-Match'] = cached.headers['ETag']
+            if 'Last-Modified' in cached.headers:
+                headers['If-Modified-Since'] = cached.headers['Last-Modified']
+        resp = get(headers)
+        if resp.status_code == 304 and cached is not None:
+            self.revalidated += 1
+            self.refresh(key)
+            return cached
+        self.misses += 1
+        if resp.status_code == 200:
+            self.store(key, resp)
+        return resp
+
+    def stats(self):
+        return {'hits': self.hits, 'revalidated': self.revalidated, 'misses': self.misses}
+
+    def close(self):
+        self.db.close()
+
+
+def cached_response(url, headers, body):
+    """
+    A requests Response made from a cached body.
+    """
+    resp = requests.models.Response()
+    resp.status_code = 200
+    resp.url = url
+    resp.headers = CaseInsensitiveDict(headers)
+    resp._content = body
+    resp.encoding = requests.utils.get_encoding_from_headers(resp.headers)
+    return resp
@@ -0,0 +1,223 @@
+"""
+On-disk pagination checkpoints so an interrupted crawl can be resumed.
+"""
+import os
+import json
+import logging
+import threading
+
+try:
+    import fcntl
+except ImportError:
+    # no locking between processes on Windows
+    fcntl = None
+
+
+class CheckpointStore(object):
+    """
+    A small JSON sidecar file recording, for every query of a crawl, the
+    max_id of the last page that was written out (or its min_id, paging
+    forward from a HighWaterMark) and how many items were collected. The parameters of the crawl are stored alongside so that a
+    resume with different parameters is refused.
+
+    sync is called before every save, it should flush the output and
+    return its size, which is recorded as the offset the output can be
+    truncated to when resuming.
+    """
+
+    def __init__(self, path, params, sync=None):
+        self.path = path
+        self.params = params
+        self.sync = sync
+        self.offset = None
+        self.queries = {}
+        self.lock = threading.Lock()
+
+    @classmethod
+    def for_output(cls, output, params, sync=None):
+        """
+        The checkpoint store that sits next to an output file.
+        """
+        return cls(output + '.checkpoint', params, sync=sync)
+
+    def exists(self):
+        return os.path.isfile(self.path)
+
+    def load(self):
+        """
+        Read a previous checkpoint, raising ValueError if it was made by a
+        crawl with different parameters.
+        """
+        with open(self.path) as fh:
+            data = json.load(fh)
+        if data.get('params') != self.params:
+            raise ValueError("checkpoint %s was made with different parameters: %s"
+                             % (self.path, data.get('params')))
+        self.queries = data.get('queries', {})
+        self.offset = data.get('offset')
+        logging.info("loaded checkpoint %s", self.path)
+
+    def previous_params(self):
+        """
+        The parameters of the crawl that made the checkpoint.
+        """
+        with open(self.path) as fh:
+            return json.load(fh).get('params', {})
+
+    def checkpoint(self, query):
+        """
+        The Checkpoint of a single query.
+        """
+        with self.lock:
+            state = self.queries.setdefault(query, {
+                'max_id': '', 'pages': 0, 'fetched': 0, 'count': 0, 'done': False
+            })
+        return Checkpoint(self, state)
+
+    def save(self):
+        """
+        Atomically write the checkpoint file, after the output has been
+        flushed so the checkpoint never gets ahead of the output.
+        """
+        with self.lock:
+            if self.sync:
+                self.offset = self.sync()
+            tmp = self.path + '.tmp'
+            with open(tmp, 'w') as fh:
+                json.dump({'params': self.params, 'offset': self.offset,
+                           'queries': self.queries}, fh)
+            os.replace(tmp, self.path)
+
+
+class Checkpoint(object):
+    """
+    Pagination state of one query, updated by the Garc paginators after
+    every page.
+    """
+
+    def __init__(self, store, state):
+        self.store = store
+        self.state = state
+
+    @property
+    def max_id(self):
+        return self.state['max_id']
+
+    @property
+    def fetched(self):
+        return self.state['fetched']
+
+    @property
+    def count(self):
+        return self.state['count']
+
+    @property
+    def done(self):
+        return self.state['done']
+
+    @property
+    def min_id(self):
+        return self.state.get('min_id', '')
+
+    def page(self, max_id, fetched, count):
+        """
+        Record a page whose items have all been handed out.
+        """
+        with self.store.lock:
+            self.state['max_id'] = max_id
+            self.state['pages'] += 1
+            self.state['fetched'] += fetched
+            self.state['count'] += count
+        self.store.save()
+
+    def forward(self, min_id, fetched, count):
+        """
+        Record a page collected forward from a HighWaterMark, whose items
+        have all been handed out.
+        """
+        with self.store.lock:
+            self.state['min_id'] = min_id
+            self.state['pages'] += 1
+            self.state['fetched'] += fetched
+            self.state['count'] += count
+        self.store.save()
+
+    def finish(self):
+        """
+        Record that the query has been collected completely.
+        """
+        with self.store.lock:
+            self.state['done'] = True
+        self.store.save()
+
+
+class HighWaterMarks(object):
+    """
+    A JSON file holding the newest status id collected for every query, so
+    that scheduled runs only have to collect what is newer. Marks are kept
+    per scope (usually the command) and query.
+
+    The file is shared by every scheduled run, so it is read again and
+    merged with the marks of this run under a lock each time it is saved,
+    keeping the newer mark of every query.
+    """
+
+    def __init__(self, path, scope, sync=None):
+        self.path = path
+        self.scope = scope
+        self.sync = sync
+        self.marks = {}
+        self.lock = threading.Lock()
+        if os.path.isfile(path):
+            with open(path) as fh:
+                self.marks = json.load(fh)
+
+    def mark(self, query):
+        """
+        The HighWaterMark of a single query.
+        """
+        return HighWaterMark(self, '%s:%s' % (self.scope, query))
+
+    def save(self):
+        with self.lock:
+            if self.sync:
+                self.sync()
+            with open(self.path + '.lock', 'w') as lock:
+                if fcntl:
+                    fcntl.flock(lock, fcntl.LOCK_EX)
+                marks = {}
+                if os.path.isfile(self.path):
+                    with open(self.path) as fh:
+                        marks = json.load(fh)
+                for key, status_id in self.marks.items():
+                    if key not in marks or int(marks[key]) < int(status_id):
+                        marks[key] = status_id
+                tmp = self.path + '.tmp'
+                with open(tmp, 'w') as fh:
+                    json.dump(marks, fh)
+                os.replace(tmp, self.path)
+
+
+class HighWaterMark(object):
+    """
+    The newest status id collected for one query.
+    """
+
+    def __init__(self, store, key):
+        self.store = store
+        self.key = key
+
+    @property
+    def since_id(self):
+        return self.store.marks.get(self.key)
+
+    def advance(self, status_id):
+        """
+        Record a newer status id, once everything up to it has been written.
+        """
+        with self.store.lock:
+            current = self.store.marks.get(self.key)
+            if current and int(current) >= int(status_id):
+                return
+            self.store.marks[self.key] = status_id
+        self.store.save()
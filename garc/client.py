@@ -1,12 +1,15 @@
 import os
 import re
 import sys
-import logging
 import time
-import requests
-import datetime
-from bs4 import BeautifulSoup
-import html
+import logging
+import threading
+from .ratelimit import RateLimiter
+from .retry import RetryPolicy
+from .cookies import CookieStore
+from .metrics import Metrics
+# window, matcher, record and text are imported by the methods that use
+# them, so that configure and a bare Garc() start quickly
 if sys.version_info[:2] <= (2, 7):
     # Python 2
     get_input = raw_input
@@ -24,9 +27,21 @@ class Garc(object):
     """
 
     def __init__(self, user_account=None, user_password=None,
-                 connection_errors=0, http_errors=0, profile='main', config=None):
+                 connection_errors=5, http_errors=5, profile='main', config=None,
+                 pool_connections=10, pool_maxsize=10, keep_alive=True,
+                 pool_block=False, rate_limiter=None, timeout=60, cache=None,
+                 base_url='https://gab.com', metrics=None, accounts=None, fields=None,
+                 hidden_fields=()):
         """
         Create a Garc instance. If account informaton isn't given it will search for them.
+
+        pool_maxsize: keep-alive connections per host, a hard limit with pool_block
+        rate_limiter: a RateLimiter, can be shared between instances
+        cache: a ResponseCache, revalidated with ETags
+        metrics: a Metrics, can be shared between instances
+        accounts: an AccountCache of the ids of usernames
+        fields: return gabs as compact records of these fields, see garc.record
+        hidden_fields: fields of the records that are left out of the output
         """
 
         self.user_account = user_account
@@ -34,8 +49,32 @@ class Garc(object):
         self.connection_errors = connection_errors
         self.http_errors = http_errors
         self.cookie = None
+        self.login_lock = threading.Lock()
         self.profile = profile
         self.search_types = ['date']
+        self.pool = {'pool_connections': pool_connections, 'pool_maxsize': pool_maxsize,
+                     'keep_alive': keep_alive, 'pool_block': pool_block}
+        self._session = None
+        self.session_lock = threading.Lock()
+        self.rate_limiter = rate_limiter or RateLimiter()
+        self.retry_policy = RetryPolicy(connection_errors=connection_errors,
+                                        http_errors=http_errors)
+        self.timeout = timeout
+        self.cache = cache
+        self.base_url = base_url.rstrip('/')
+        self.metrics = metrics or Metrics()
+        self._accounts = accounts
+        self.accounts_lock = threading.Lock()
+        self.record = None
+        if fields:
+            from .record import record_type
+            self.record = record_type(fields, hidden_fields)
+        self.metrics.add_source('connections', self.connection_stats)
+        self.metrics.add_source('retries', self.retry_policy.stats)
+        self.metrics.add_source('rate_limit', self.rate_limiter.stats)
+        self.metrics.add_source('accounts', self.account_stats)
+        if cache:
+            self.metrics.add_source('cache', cache.stats)
 
 
 
@@ -47,13 +86,21 @@ class Garc(object):
         else:
             self.config = self.default_config()
 
+        self.cookie_store = CookieStore.for_config(self.config, self.profile)
+        self.login_time = 0
+
         self.check_keys()
         self.load_headers()
 
-    def search(self, q, search_type='date', gabs=-1):
+    def search(self, q, search_type='date', gabs=-1, checkpoint=None, since=None,
+               gabs_after=None, gabs_before=None):
         """
         Pass in a query. Defaults to recent sort by date.
         Defaults to retrieving as many historical gabs as possible.
+        A Checkpoint resumes the search from its last page and is updated
+        after every page. With a HighWaterMark only gabs newer than the
+        ones collected by the previous run are returned. gabs_after and
+        gabs_before limit the search to the gabs created between them.
         """
         # This can be expanded to other Gab search types
         if search_type in self.search_types:
@@ -61,62 +108,93 @@ class Garc(object):
         else:
             search_type = 'date'
 
-        num_gabs = 0
-        max_id = ''
+        from .window import TimeWindow
+        window = TimeWindow(gabs_after, gabs_before)
+        base_url = self.base_url + "/api/v1/timelines/tag/%s?" % (q)
+        if checkpoint and checkpoint.done:
+            return
+        if since and since.since_id:
+            for post in self.newer(base_url, q, since, gabs, window, checkpoint):
+                yield self.format_post(post)
+            return
+
+        newest = None
+        max_id = (checkpoint.max_id if checkpoint else '') or window.max_id
+        # only the gabs in the window count towards gabs
+        num_gabs = checkpoint.count if checkpoint else 0
         while True:
 
             # url = "https://gab.com/api/search?q=%s&sort=%s&before=%s" % (q, search_type, num_gabs)
-            url = "https://gab.com/api/v1/timelines/tag/%s?max_id=%s" % (q, max_id)
+            url = base_url + "max_id=%s" % (max_id)
             resp = self.get(url)
 
-            # We should probably implement some better error catching
-            # not simply checking for a 500 to know we've gotten all the gabs possible
-            if resp.status_code == 500:
-                logging.error("search for %s failed, recieved 500 from Gab.com", (q))
-                break
-            elif resp.status_code == 429:
-                logging.warn("rate limited, sleeping two minutes")
-                time.sleep(100)
-                continue
+            # the retry policy has already retried anything worth retrying
+            if resp.status_code != 200:
+                logging.error("search for %s failed, recieved %s from Gab.com", q, resp.status_code)
+                return
             posts = resp.json()
+            self.metrics.count('statuses_fetched', len(posts))
 
             # API seems to be more stable than previously and will not send 500
             # as it runs out of data, now returns empty results
             if not posts:
                 logging.info("No more posts returned for search: %s", (q))
                 break
+            newest = newest or posts[0]['id']
             max_id = posts[-1]['id']
+            found = 0
             for post in posts:
-                yield post
-            num_gabs += len(posts)
+                if window.contains(post):
+                    found += 1
+                    yield self.format_post(post)
+            num_gabs += found
+            if checkpoint:
+                checkpoint.page(max_id, len(posts), found)
             if  (num_gabs > gabs and gabs != -1):
                 break
-    def public_search(self, q,  gabs=-1,gabs_after=(datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(minutes=20)).strftime("%Y-%m-%dT%H:%M")):
+            if window.passed(posts):
+                logging.info("reached gabs from before %s for search: %s", gabs_after, q)
+                break
+        if checkpoint:
+            checkpoint.finish()
+        if since and newest:
+            since.advance(newest)
+
+    def public_search(self, q, gabs=-1, gabs_after=None, checkpoint=None, gabs_before=None):
         """
         Pass in a query. 
         Searches the public Gab timeline for posts which match query q
         Match is case insensitive
-        """
+        q can also be a list of queries, or a Matcher, which are all
+        matched in one pass. The queries found in a post are listed in
+        its matched_terms field.
+        Without gabs_after or gabs_before the last 20 minutes are searched.
+        """
+        from .matcher import Matcher
+        from .window import TimeWindow
+        matcher = q if isinstance(q, Matcher) else Matcher(q)
+        if gabs_after or gabs_before:
+            window = TimeWindow(gabs_after, gabs_before)
+        else:
+            window = TimeWindow.last(20)
 
-        num_gabs = 0
-        max_id = ''
+        if checkpoint and checkpoint.done:
+            return
+        max_id = (checkpoint.max_id if checkpoint else '') or window.max_id
+        num_gabs = checkpoint.fetched if checkpoint else 0
         while True:
 
-            url = "https://gab.com/api/v1/timelines/public?limit=40&max_id=%s" % (max_id)  
+            url = self.base_url + "/api/v1/timelines/public?limit=40&max_id=%s" % (max_id)  
 
             resp = self.anonymous_get(url)
             # time.sleep(1)
 
-            # We should probably implement some better error catching
-            # not simply checking for a 500 to know we've gotten all the gabs possible
-            if resp.status_code == 500:
-                logging.error("search for %s failed, recieved 500 from Gab.com", (q))
+            # the retry policy has already retried anything worth retrying
+            if resp.status_code != 200:
+                logging.error("search for %s failed, recieved %s from Gab.com", q, resp.status_code)
                 return
-            elif resp.status_code == 429:
-                logging.warn("rate limited, sleeping two minutes")
-                time.sleep(100)
-                break
             posts = resp.json()
+            self.metrics.count('statuses_fetched', len(posts))
 
             # API seems to be more stable than previously and will not send 500
             # as it runs out of data, now returns empty results
@@ -124,94 +202,209 @@ class Garc(object):
                 logging.info("No more posts returned for search: %s", (q))
                 break
 
+            matches = 0
             for post in posts:
-                if self.search_gab_text(post,q):
+                terms = window.contains(post) and matcher.match(post)
+                if terms:
+                    matches += 1
+                    post['matched_terms'] = terms
                     yield self.format_post(post)
                 max_id = post['id']
-                max_created_at = post['created_at']
             num_gabs += len(posts)
+            if checkpoint:
+                checkpoint.page(max_id, len(posts), matches)
             if  (num_gabs > gabs and gabs != -1):
                 logging.info("Number of gabs condition met: %s", (q))
                 break
 
-            # Check if first collected gab is after the date specified
-            # The API returns strange results sometimes where gabs are not in date order, so ocassionally random dates pop up
-            # But these never seem to appear at the start, so checking the first item keeps the function from prematurely ending
-            # It does mean an additional call is made however
-            if posts[0]['created_at'] < gabs_after:
-                if posts[1]['created_at'] < gabs_after:
-                    if posts[2]['created_at'] < gabs_after:
-                        if posts[-1]['created_at'] < gabs_after:
+            # The API returns strange results sometimes where gabs are not
+            # in date order, TimeWindow.passed allows for the odd one
+            if window.passed(posts):
+                logging.info("Gabs after condition met: %s", (q))
+                break
+        if checkpoint:
+            checkpoint.finish()
 
-                            logging.info("Gabs after condition met: %s", (q))
+    def public_fanout(self, queries, **kwargs):
+        """
+        Search the public Gab timeline for several queries at once. queries
+        maps a name to a term or list of terms. Every page is fetched only
+        once, and (name, post) is returned for each query a post matches,
+        with matched_terms holding the terms of that query.
+        The other arguments are passed on to public_search.
+        """
+        from .matcher import Router
+        router = Router(queries)
+        for post in self.public_search(router.matcher, **kwargs):
+            for name, terms in router.route(post['matched_terms']):
+                yield name, dict(post, matched_terms=terms)
+
+    def stream(self, timeline='public', q=None, gabs=-1, **kwargs):
+        """
+        Follow the public timeline, the timeline of hashtag q or the
+        home timeline of the user ('public', 'hashtag' or 'user') live,
+        returning new gabs as they are published. Uses the streaming API
+        and falls back to polling when it isn't available, see Stream.
+        """
+        num_gabs = 0
+        from .stream import Stream
+        for post in Stream(self, timeline, q, **kwargs).statuses():
+            yield post
+            num_gabs += 1
+            if num_gabs == gabs:
+                break
 
-                            break
     def user(self, q):
         """
         collect user json data
         """
-        url = 'https://gab.com/api/v1/account_by_username/%s' % (q)
+        url = self.base_url + '/api/v1/account_by_username/%s' % (q)
         resp = self.get(url)
+        if resp.status_code == 200:
+            self.accounts.put([resp.json()])
         yield resp.json()
 
     def top(self, timespan=None):
         if timespan is None: timespan = "today"
         assert timespan in ["today", "weekly", "monthly", "yearly"]
 
-        url = "https://gab.com/api/v1/timelines/explore?sort_by=top_%s" % timespan
+        url = self.base_url + "/api/v1/timelines/explore?sort_by=top_%s" % timespan
 
         resp = self.anonymous_get(url)
         return resp.json()
 
 
-    def userposts(self, q, gabs=-1, gabs_after='2000-01-01'):
+    def userposts(self, q, gabs=-1, gabs_after=None, checkpoint=None, since=None, gabs_before=None):
         """
-        collect posts from a user feed
+        collect posts from a user feed, created between gabs_after and
+        gabs_before when they are given
         """
+        if checkpoint and checkpoint.done:
+            return
+        from .window import TimeWindow
+        window = TimeWindow(gabs_after, gabs_before)
+        max_id = (checkpoint.max_id if checkpoint else '') or window.max_id
+        # only the gabs in the window count towards gabs
+        num_gabs = checkpoint.count if checkpoint else 0
         # We need to get the account id to collect statuses
-        account_url = 'https://gab.com/api/v1/account_by_username/%s' % (q)
-        account_id = self.get(account_url).json()['id']
-        max_id = ''
-        base_url = "https://gab.com/api/v1/accounts/%s/statuses?exclude_replies=true&max_id=" % (account_id)
-        
-        num_gabs = 0
+        account_id = self.account_id(q)
+        base_url = self.base_url + "/api/v1/accounts/%s/statuses?exclude_replies=true&" % (account_id)
+        if since and since.since_id:
+            for post in self.newer(base_url, q, since, gabs, window, checkpoint):
+                yield self.format_post(post)
+            return
+
+        newest = None
         while True:
-            url = base_url + max_id
+            url = base_url + "max_id=" + max_id
             resp = self.get(url)
+            if resp.status_code != 200:
+                logging.error("collecting %s failed, recieved %s from Gab.com", q, resp.status_code)
+                return
             posts = resp.json()
+            self.metrics.count('statuses_fetched', len(posts))
             if not posts:
                 break
-            last_published_date = posts[-1]['created_at']
+            newest = newest or posts[0]['id']
+            found = 0
             for post in posts:
-                yield self.format_post(post)
+                if window.contains(post):
+                    found += 1
+                    yield self.format_post(post)
                 max_id = post['id']
-            num_gabs += len(posts)
-            if last_published_date < gabs_after:
+            num_gabs += found
+            if checkpoint:
+                checkpoint.page(max_id, len(posts), found)
+            if window.passed(posts):
                 break
             if  (num_gabs > gabs and gabs != -1):
                 break
-    def usercomments(self, q):
+        if checkpoint:
+            checkpoint.finish()
+        if since and newest:
+            since.advance(newest)
+
+    def usercomments(self, q, checkpoint=None, since=None, gabs_after=None, gabs_before=None):
         """
-        collect comments from a users feed
+        collect comments from a users feed, created between gabs_after and
+        gabs_before when they are given
         """
+        if checkpoint and checkpoint.done:
+            return
+        from .window import TimeWindow
+        window = TimeWindow(gabs_after, gabs_before)
+        max_id = (checkpoint.max_id if checkpoint else '') or window.max_id
         # We need to get the account id to collect statuses
-        account_url = 'https://gab.com/api/v1/account_by_username/%s' % (q)
-        account_id = self.get(account_url).json()['id']
-        max_id = ''
-        base_url = "https://gab.com/api/v1/accounts/%s/statuses?only_comments=true&exclude_replies=false&max_id=" % (account_id)
-        
-        num_gabs = 0
+        account_id = self.account_id(q)
+        base_url = self.base_url + "/api/v1/accounts/%s/statuses?only_comments=true&exclude_replies=false&" % (account_id)
+        if since and since.since_id:
+            for post in self.newer(base_url, q, since, window=window, checkpoint=checkpoint):
+                yield self.format_post(post)
+            return
+
+        newest = None
         while True:
-            url = base_url + max_id
+            url = base_url + "max_id=" + max_id
             resp = self.get(url)
+            if resp.status_code != 200:
+                logging.error("collecting %s failed, recieved %s from Gab.com", q, resp.status_code)
+                return
             posts = resp.json()
+            self.metrics.count('statuses_fetched', len(posts))
             if not posts:
                 break
-            last_published_date = posts[-1]['created_at']
+            newest = newest or posts[0]['id']
+            found = 0
             for post in posts:
-                yield self.format_post(post)
+                if window.contains(post):
+                    found += 1
+                    yield self.format_post(post)
                 max_id = post['id']
+            if checkpoint:
+                checkpoint.page(max_id, len(posts), found)
+            if window.passed(posts):
+                break
+        if checkpoint:
+            checkpoint.finish()
+        if since and newest:
+            since.advance(newest)
+
+    def newer(self, base_url, q, since, gabs=-1, window=None, checkpoint=None):
+        """
+        Page forward from a HighWaterMark with min_id, returning only
+        statuses newer than the ones already collected, and within the
+        TimeWindow when one is given. The mark is moved forward after
+        every page, and the Checkpoint too when there is one, a resumed
+        run carries on from the last page of the checkpoint.
+        """
+        min_id = (checkpoint.min_id if checkpoint else '') or since.since_id
+        num_gabs = checkpoint.fetched if checkpoint else 0
+        while True:
+            url = base_url + "min_id=%s" % (min_id)
+            resp = self.get(url)
+            if resp.status_code != 200:
+                logging.error("collecting %s failed, recieved %s from Gab.com", q, resp.status_code)
+                return
+            posts = resp.json()
+            self.metrics.count('statuses_fetched', len(posts))
+            if not posts:
+                logging.info("No new posts for %s since %s", q, since.since_id)
+                break
+            found = 0
+            for post in posts:
+                if window is None or window.contains(post):
+                    found += 1
+                    yield post
+            # ids are numeric strings of varying length
+            min_id = max((post['id'] for post in posts), key=int)
+            if checkpoint:
+                checkpoint.forward(min_id, len(posts), found)
+            since.advance(min_id)
             num_gabs += len(posts)
+            if  (num_gabs > gabs and gabs != -1):
+                break
+        if checkpoint:
+            checkpoint.finish()
 
     def login(self):
         """
@@ -223,111 +416,184 @@ class Garc(object):
         if self.cookie:
             logging.info("refreshing login cookie")
 
-        url = "https://gab.com/auth/sign_in"
-        input_token = requests.get(url,headers = self.headers)
-        page_info = BeautifulSoup(input_token.content, "html.parser")
-        token = page_info.select('meta[name=csrf-token]')[0]['content']
+        url = self.base_url + "/auth/sign_in"
+        input_token = self.session.get(url, headers=self.headers, stream=True)
+        token = csrf_token(input_token)
+        input_token.close()
+        if not token:
+            raise RuntimeError("no csrf token found on %s" % url)
 
         payload = {'user[email]':self.user_account, 'user[password]':self.user_password, 'authenticity_token':token}
 
-        d = requests.request("POST", url, params=payload, cookies=input_token.cookies,headers = self.headers)
+        d = self.session.request("POST", url, params=payload, cookies=input_token.cookies,headers = self.headers)
         self.cookie = d.cookies
+        self.login_time = time.time()
+        self.cookie_store.save(self.user_account, self.cookie)
 
-    def followers(self,q):
+    def authenticate(self, rejected=None):
         """
-        find all followers of a specific user
-        This is currently broken
+        Make sure there is a login cookie, reusing the one saved by an
+        earlier run when possible. When a request was rejected with the
+        cookie given as rejected, sign in again, unless another thread
+        already did or the cookie was only just made, in which case the
+        rejection wasn't about the login.
         """
-        num_followers = 0
-        while True:
-            url = "https://gab.com/users/%s/followers?before=%s" % (q,num_followers)
-            resp = self.get(url)
-            posts = resp.json()["data"]
-            if not posts:
-                break
-            for post in posts:
-                yield post
-            num_followers += len(posts)
+        with self.login_lock:
+            if rejected is None:
+                if not self.cookie:
+                    self.cookie = self.cookie_store.load(self.user_account)
+                if not self.cookie:
+                    self.login()
+            elif self.cookie is rejected and time.time() - self.login_time > 600:
+                self.cookie_store.clear()
+                self.login()
 
-    def following(self,q):
+    def account_id(self, q):
         """
-        This is currently broken
+        The id of the account with username q, or the id itself when q is
+        given as id:<id>, since usernames can be all digits too. Ids are
+        looked up once and then taken from the AccountCache.
         """
-        num_followers = 0
-        while True:
-            url = "https://gab.com/users/%s/following?before=%s" % (q,num_followers)
-            resp = self.get(url)
-            posts = resp.json()["data"]
-            if not posts:
-                break
-            for post in posts:
-                yield post
-            num_followers += len(posts)
+        if str(q).startswith('id:'):
+            return str(q)[3:]
+        account = self.accounts.get(q)
+        if account:
+            return str(account['id'])
+        resp = self.get(self.base_url + '/api/v1/account_by_username/%s' % (q))
+        if resp.status_code != 200:
+            raise ValueError("no account %s, recieved %s from Gab.com" % (q, resp.status_code))
+        self.accounts.put([resp.json()])
+        return str(resp.json()['id'])
 
+    def followers(self, q):
+        """
+        find all followers of a specific user, given by username or id:<id>
+        """
+        for account in self.connections(self.account_id(q), 'followers'):
+            yield account
 
+    def following(self, q):
+        """
+        find all the accounts a specific user follows
+        """
+        for account in self.connections(self.account_id(q), 'following'):
+            yield account
+
+    def connections(self, account_id, relation):
+        """
+        The accounts in the followers or following list of an account,
+        paging with the next links of the Link header. A page that can't
+        be collected raises ValueError, the list would be incomplete.
+        """
+        url = self.base_url + "/api/v1/accounts/%s/%s?limit=80" % (account_id, relation)
+        while url:
+            resp = self.get(url)
+            if resp.status_code != 200:
+                raise ValueError("collecting %s of %s failed, recieved %s from Gab.com"
+                                 % (relation, account_id, resp.status_code))
+            accounts = resp.json()
+            if not accounts:
+                break
+            for account in accounts:
+                yield account
+            url = resp.links.get('next', {}).get('url')
 
     def get(self, url, **kwargs):
         """
         Perform the API requests
         """
         if not self.cookie:
-            self.login()
-
-        connection_error_count = kwargs.pop('connection_error_count', 1)
-        try:
-            logging.info("getting %s %s", url, kwargs)
-
-            r = requests.get(url, cookies=self.cookie, headers = self.headers)
-            # Maybe should implement allow_404 that stops retrying, ala twarc
-
-            if r.status_code == 404:
-                logging.warn("404 from Gab API! trying again")
-                time.sleep(10)
-                r = self.get(url, **kwargs)
-            if r.status_code == 500:
-                logging.warn("500 from Gab API! trying again")
-                time.sleep(15)
-                r = self.get(url, **kwargs)
-            return r
-        except requests.exceptions.ConnectionError as e:
-            logging.warn("Connection Error from Gab API! trying again")
-            time.sleep(15)
-
-            self.get(url, **kwargs)
+            self.authenticate()
+
+        logging.info("getting %s %s", url, kwargs)
+        cookie = self.cookie
+        resp = self.retry_policy.call(lambda: self.fetch(url, cookies=cookie))
+        if resp.status_code in (401, 403):
+            logging.info("recieved %s from Gab.com, checking the login", resp.status_code)
+            self.authenticate(rejected=cookie)
+            if self.cookie is not cookie:
+                resp = self.retry_policy.call(lambda: self.fetch(url, cookies=self.cookie))
+        return resp
+
     def anonymous_get(self, url, **kwargs):
         """
         Perform an anonymous API request. Used for accessing public timelines.
         """
+        logging.info("getting %s %s", url, kwargs)
+        return self.retry_policy.call(lambda: self.fetch(url))
 
-        connection_error_count = kwargs.pop('connection_error_count', 1)
-        try:
-            logging.info("getting %s %s", url, kwargs)
-            r = requests.get(url, headers = self.headers)
-            # Maybe should implement allow_404 that stops retrying, ala twarc
+    def fetch(self, url, **kwargs):
+        """
+        Send a single request, unless it can be answered by the response
+        cache.
+        """
+        if self.cache:
+            return self.cache.fetch(url, lambda headers: self.send(url, headers, **kwargs),
+                                    authenticated='cookies' in kwargs)
+        return self.send(url, {}, **kwargs)
 
-            if r.status_code == 404:
-                logging.warn("404 from Gab API! trying again")
-                time.sleep(15)
-                r = self.anonymous_get(url, **kwargs)
-            if r.status_code == 500:
-                logging.warn("500 from Gab API! trying again")
-                time.sleep(15)
-                r = self.anonymous_get(url, **kwargs)
-            return r
-        except requests.exceptions.ConnectionError as e:
-            logging.warn("Connection Error from Gab API! trying again")
-            time.sleep(15)
+    def send(self, url, headers, **kwargs):
+        """
+        Send a single request with extra headers, paced by the rate limiter,
+        and record it in the metrics.
+        """
+        self.rate_limiter.wait()
+        started = time.time()
+        r = self.session.get(url, headers=dict(self.headers, **headers),
+                             timeout=self.timeout, **kwargs)
+        self.metrics.request(url, time.time() - started, len(r.content), r.status_code)
+        self.rate_limiter.update(r)
+        return r
 
-            self.anonymous_get(url, **kwargs)
+    @property
+    def session(self):
+        """
+        The pooled session, made on first use so that requests is only
+        imported by commands that send any.
+        """
+        if self._session is None:
+            with self.session_lock:
+                if self._session is None:
+                    from .session import new_session
+                    self._session = new_session(**self.pool)
+        return self._session
 
+    @property
+    def accounts(self):
+        """
+        The AccountCache, an in memory one made on first use unless one
+        was given, so that commands that don't look up accounts don't
+        open a database.
+        """
+        if self._accounts is None:
+            with self.accounts_lock:
+                if self._accounts is None:
+                    from .accounts import AccountCache
+                    self._accounts = AccountCache()
+        return self._accounts
 
+    def account_stats(self):
+        if self._accounts is None:
+            return {'hits': 0, 'misses': 0}
+        return self._accounts.stats()
+
+    def connection_stats(self):
+        """
+        Number of requests made so far and how many of them reused a pooled
+        connection versus opening a new one.
+        """
+        if self._session is None:
+            return {'requests': 0, 'new_connections': 0, 'reused_connections': 0}
+        from .session import connection_stats
+        return connection_stats(self._session)
 
     def search_gab_text(self,gab,query):
         """
         Search if query exists within the text of a gab
         Return True if it does, False if not
         """
-        if  re.search(query.lower(),gab['content'].lower()):
+        from .text import html_to_text
+        if  re.search(query, html_to_text(gab['content']), re.IGNORECASE):
             match = True
         else:
             match = False
@@ -337,9 +603,17 @@ class Garc(object):
     def format_post(self,post):
         """
         Format post so that body field is inserted, this harmonizes new mastodon data with old gab data
-        """
-        body = BeautifulSoup(html.unescape(post['content']), features="html.parser").get_text()
-        post['body'] = body
+        When fields were given a record of just those fields is returned.
+        """
+        if self.record is not None and isinstance(post, self.record):
+            return post
+        started = time.time()
+        if self.record is None or 'body' in self.record.slots:
+            from .text import html_to_text
+            post['body'] = html_to_text(post['content'])
+        if self.record is not None:
+            post = self.record.from_status(post)
+        self.metrics.count('format_post_seconds', time.time() - started)
         return post
 
 
@@ -462,3 +736,20 @@ class Garc(object):
         with open(self.config, 'w') as config_file:
             config.write(config_file)
 
+
+def csrf_token(resp):
+    """
+    The csrf token in the meta tags of a streamed sign in page, reading no
+    further than its head.
+    """
+    import html
+    head = b''
+    for chunk in resp.iter_content(8192):
+        head += chunk
+        tag = re.search(rb'<meta[^>]*name=["\']csrf-token["\'][^>]*>', head)
+        if tag:
+            content = re.search(rb'content=["\']([^"\']*)', tag.group(0))
+            return html.unescape(content.group(1).decode('utf8')) if content else None
+        if b'</head>' in head:
+            break
+    return None
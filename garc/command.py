@@ -1,13 +1,17 @@
 from __future__ import print_function
 
+import os
 import sys
-import json
 import signal
+import atexit
 import codecs
 import logging
 import argparse
 from garc import __version__
-from garc.client import Garc
+
+# everything else is imported by the commands and options that use it, so
+# that short runs like garc version don't load requests, asyncio, sqlite
+# or the output writers
 if sys.version_info[:2] <= (2, 7):
     # Python 2
     get_input = raw_input
@@ -18,17 +22,43 @@ else:
     str_type = str
 
 
+# output formats, the names of garc.output.WRITERS
+formats = ['json', 'csv', 'parquet']
+
+# commands that paginate and can be resumed from a checkpoint
+resumable = ['search', 'userposts', 'usercomments', 'publicsearch']
+
+# commands that can collect only what is new since the last run
+incremental = ['search', 'userposts', 'usercomments']
+
+# commands that can be split into time ranges collected in parallel
+shardable = ['search', 'userposts', 'usercomments']
+
 commands = [
+    'version',
     'configure',
     'user_agent',
     'help',
     'search',
     'user',
+    'users',
     'userposts',
     'usercomments',
-    'top'
+    'followers',
+    'following',
+    'graph',
+    'publicsearch',
+    'stream',
+    'top',
+    'query'
 ]
 
+# commands that return gabs, which --dedup can skip when seen before
+statuses = ['search', 'userposts', 'usercomments', 'publicsearch', 'stream', 'top']
+
+# commands whose gabs can be cut down to some of their fields
+projectable = ['search', 'userposts', 'usercomments', 'publicsearch', 'stream']
+
 
 def main():
     parser = get_argparser()
@@ -57,48 +87,385 @@ def main():
         print("\nFor example:\n\n    garc search make america great again")
         sys.exit(1)
 
+    # csv and parquet have the columns of a gab, accounts would lose most
+    # of their fields
+    if args.format != 'json' and command not in statuses + ['query']:
+        sys.exit("--format %s works with: %s"
+                 % (args.format, ", ".join(statuses + ['query'])))
+
+    # bad dates are reported before any output is opened
+    if args.gabs_after or args.gabs_before:
+        from garc.window import TimeWindow
+        try:
+            TimeWindow(args.gabs_after, args.gabs_before)
+        except (ValueError, OverflowError) as e:
+            sys.exit("invalid --gabs_after or --gabs_before: %s" % e)
+
+    # gabs are cut down to the fields asked for as soon as they are fetched,
+    # for csv and parquet the fields are columns and the record keeps what
+    # their values are made from
+    fields = None
+    hidden = []
+    columns = None
+    if args.fields:
+        from garc.record import parse_fields
+        from garc.output import select_columns, column_sources
+        if command not in projectable or args.archive or args.fanout:
+            sys.exit("--fields works with: %s, without --archive or --fanout"
+                     % ", ".join(projectable))
+        try:
+            fields = parse_fields(args.fields)
+            if args.format != 'json':
+                columns = select_columns(fields)
+                fields = column_sources(columns)
+        except ValueError as e:
+            sys.exit(str(e))
+        # ids are needed by checkpoints and --dedup, threads need replies
+        needed = ['id']
+        if args.expand_threads:
+            needed += ['in_reply_to_id', 'replies_count', 'thread_root']
+            # only kept to find the conversations, not written out
+            hidden = [f for f in ('in_reply_to_id', 'replies_count') if f not in fields]
+        fields = ['id'] + [f for f in fields if f != 'id'] + \
+            [f for f in needed if f not in fields and f != 'id']
+
+    # lookups in the local archive don't need Gab at all
+    if command == "query":
+        from garc.archive import Archive
+        from garc.output import open_writer, compression_for
+        if not args.archive:
+            sys.exit("query needs --archive")
+        archive = Archive(args.archive)
+        try:
+            out = open_writer(args.format, args.output,
+                              compression=args.compress or compression_for(args.output))
+        except RuntimeError as e:
+            sys.exit(str(e))
+        try:
+            for thing in archive.query(query, account=args.account, tag=args.tag,
+                                       after=args.gabs_after, before=args.gabs_before,
+                                       limit=args.number_gabs):
+                out.write(thing)
+        except ValueError as e:
+            sys.exit(str(e))
+        finally:
+            out.close()
+            archive.close()
+        logging.info("found %s gabs in %s", out.items, args.archive)
+        sys.exit()
+
+    from garc.client import Garc
+    from garc.metrics import Progress, MetricsServer
+    if args.cache:
+        from garc.cache import ResponseCache
+    if args.account_cache:
+        from garc.accounts import AccountCache
+
+    # concurrent crawls share a limited number of connections
+    concurrent = bool(args.from_file) or command == 'graph' or bool(args.shards)
+
     g = Garc(
         user_account=args.user_account,
         user_password=args.user_password,
         connection_errors=args.connection_errors,
         http_errors=args.http_errors,
         config=args.config,
-        profile=args.profile)
+        profile=args.profile,
+        pool_maxsize=args.per_host if concurrent else args.pool_size,
+        pool_block=concurrent,
+        keep_alive=not args.no_keep_alive,
+        cache=ResponseCache(args.cache, max_size=args.cache_size) if args.cache else None,
+        base_url=args.base_url,
+        accounts=AccountCache(args.account_cache, ttl=args.account_ttl * 3600) if args.account_cache else None,
+        fields=fields,
+        hidden_fields=hidden)
+
+    # setting up garc only needs the client
+    if command == 'user_agent':
+        g.save_user_agent()
+        sys.exit()
+    elif command == "configure":
+        g.input_keys()
+        sys.exit()
+
+    # live progress, and metrics served while crawling or saved at the end
+    progress = Progress(g.metrics).start() if args.progress else None
+    server = MetricsServer(g.metrics, args.metrics_port).start() if args.metrics_port else None
+
+    def report():
+        if progress:
+            progress.stop()
+        if args.metrics:
+            g.metrics.save(args.metrics)
+        if server:
+            server.stop()
+
+    atexit.register(report)
+
+    # a file of queries is collected concurrently and merged into one stream
+    if args.from_file:
+        from garc.crawler import AsyncCrawler
+        # publicsearch terms are matched as they are, @ and all
+        if command == 'publicsearch':
+            queries = read_terms(args.from_file)
+        else:
+            queries = read_queries(args.from_file)
+        crawler = AsyncCrawler(g, concurrency=args.concurrency)
+        # resolve all the usernames at once rather than one per timeline
+        if command in ('userposts', 'usercomments', 'graph'):
+            from garc.accounts import AccountResolver
+            AccountResolver(g, concurrency=args.concurrency).resolve(queries)
+
+    # invalid search terms are reported before any output is opened
+    if command == 'publicsearch' and args.fanout:
+        subscriptions = read_subscriptions(args.fanout)
+        check_terms(term for terms in subscriptions.values() for term in terms)
+    elif command == 'publicsearch':
+        check_terms(queries if args.from_file else [query])
+
+    # the follower graph is written as an edge list, with its own state
+    if command == 'graph':
+        from garc.graph import GraphCrawler
+        if not args.output:
+            sys.exit("graph needs --output for its edge list")
+        relations = ['following', 'followers'] if args.relation == 'both' else [args.relation]
+        graph = GraphCrawler(g, args.output, relations=relations, depth=args.depth,
+                             concurrency=args.concurrency, max_accounts=args.max_accounts)
+        try:
+            graph.open(queries if args.from_file else [query], resume=args.resume)
+            graph.crawl()
+        except ValueError as e:
+            sys.exit(str(e))
+        finally:
+            graph.close()
+        sys.exit()
+
+    # paginated crawls written to a file keep a checkpoint next to it,
+    # unless the file can't be appended to when resuming or expanded
+    # threads reorder the output
+    params = {
+        'command': command,
+        'query': query,
+        'from_file': args.from_file,
+        'number_gabs': args.number_gabs,
+        'gabs_after': args.gabs_after,
+        'gabs_before': args.gabs_before,
+        'search_type': args.search_type,
+        'incremental': args.incremental
+    }
+    if args.fields:
+        params['fields'] = args.fields
+    from garc.output import WRITERS, open_writer, compression_for
+    from garc.checkpoint import CheckpointStore, HighWaterMarks
+    checkpoints = None
+    if (args.output and command in resumable and WRITERS[args.format].appendable
+            and not args.expand_threads and not args.shards):
+        checkpoints = CheckpointStore.for_output(args.output, params)
+
+    # publicsearch searches the last 20 minutes without a time range, they
+    # are fixed in the checkpoint so that a resumed run searches the same
+    if checkpoints and command == 'publicsearch' and not (args.gabs_after or args.gabs_before):
+        from garc.window import TimeWindow
+        previous = checkpoints.previous_params() if args.resume and checkpoints.exists() else {}
+        args.gabs_after = previous.get('gabs_after') or TimeWindow.last(20).after_text
+        params['gabs_after'] = args.gabs_after
+
+    # a sharded crawl keeps a checkpoint for every shard instead
+    if args.shards:
+        from garc.shard import ShardedCrawl
+        # every shard is a range of time, the newest number_gabs would be
+        # spread across them
+        if (command not in shardable or args.from_file or args.incremental or not args.output
+                or args.number_gabs != -1):
+            sys.exit("--shards needs --output and one of: %s, without --from-file, "
+                     "--incremental or --number_gabs" % ", ".join(shardable))
+        methods = {'search': g.search, 'userposts': g.userposts, 'usercomments': g.usercomments}
+        kwargs = {'search_type': args.search_type} if command == 'search' else {}
+        sharded = ShardedCrawl(methods[command], query, args.output, params,
+                               shards=args.shards, workers=args.concurrency,
+                               after=args.gabs_after, before=args.gabs_before, **kwargs)
+        try:
+            sharded.plan(resume=args.resume)
+            sharded.crawl()
+        except (ValueError, RuntimeError) as e:
+            sys.exit(str(e))
+    elif args.resume:
+        if not checkpoints:
+            sys.exit("--resume needs --output in json or csv format, without --expand-threads, and one of: %s" % ", ".join(resumable))
+        if checkpoints.exists():
+            try:
+                checkpoints.load()
+            except ValueError as e:
+                sys.exit(str(e))
+        else:
+            logging.info("no checkpoint at %s, starting from the beginning", checkpoints.path)
+
+    compression = args.compress or compression_for(args.output)
+    if args.resume and not args.shards and (compression or args.rotate_items or args.rotate_size):
+        sys.exit("--resume can't be used with compressed or rotated output")
+
+    # streamed gabs trickle in, they are written out as they arrive (every
+    # minute for parquet, where each flush is a row group)
+    flush_interval = None
+    if command == 'stream':
+        flush_interval = 60 if args.format == 'parquet' else 0
+
+    def writer(path, append=False):
+        kwargs = {'columns': columns} if columns else {}
+        # writers refuse options they can't honour, e.g. parquet to stdout
+        try:
+            return open_writer(args.format, path, compression=compression,
+                               rotate_items=args.rotate_items,
+                               rotate_bytes=args.rotate_size, append=append,
+                               flush_interval=flush_interval, **kwargs)
+        except RuntimeError as e:
+            sys.exit(str(e))
+
+    # get the output writer, when resuming drop anything written after
+    # the last checkpoint and append to the rest
+    if args.output and args.resume and checkpoints and checkpoints.offset is not None:
+        with open(args.output, 'r+b') as partial:
+            partial.truncate(checkpoints.offset)
+        out = writer(args.output, append=True)
+    else:
+        out = writer(args.output)
+
+    # gabs written by earlier runs, committed together with the output
+    seen = None
+    if args.dedup:
+        from garc.dedup import SeenIndex
+        if command not in statuses or args.fanout:
+            sys.exit("--dedup works with: %s" % ", ".join(statuses))
+        seen = SeenIndex(args.dedup, commit_every=None if checkpoints else 10000,
+                         sync=out.flush)
+
+    # gabs are also added to the local archive
+    archive = None
+    if args.archive:
+        from garc.archive import Archive
+        if command not in statuses:
+            sys.exit("--archive works with: %s" % ", ".join(statuses + ['query']))
+        archive = Archive(args.archive)
+
+    def sync():
+        if seen:
+            seen.commit()
+        else:
+            out.flush()
+        return out.tell()
+
+    if checkpoints:
+        checkpoints.sync = sync
+
+    # high-water marks of previous runs for --incremental
+    marks = None
+    if args.incremental:
+        # expanded threads read ahead of what has been written, the marks
+        # would move past gabs that never reach the output
+        if command not in incremental or args.expand_threads:
+            sys.exit("--incremental works with: %s, without --expand-threads"
+                     % ", ".join(incremental))
+        marks = HighWaterMarks(args.state_file, command, sync=sync)
+
+    def checkpoint(q):
+        return checkpoints.checkpoint(q) if checkpoints else None
+
+    def since(q):
+        return marks.mark(q) if marks else None
 
     # calls that return gabs
-    if command == "search":
+    if args.shards:
+        things = sharded.merged()
+    elif command == "search" and args.from_file:
+        things = crawler.search(
+            queries,
+            search_type=args.search_type,
+            gabs=args.number_gabs,
+            gabs_after=args.gabs_after,
+            gabs_before=args.gabs_before,
+            checkpoints=checkpoints,
+            marks=marks
+        )
+    elif command == "search":
         things = g.search(
             query,
             search_type=args.search_type,
-            gabs=args.number_gabs
+            gabs=args.number_gabs,
+            gabs_after=args.gabs_after,
+            gabs_before=args.gabs_before,
+            checkpoint=checkpoint(query),
+            since=since(query)
         )
 
-    elif command == 'user_agent':
-        g.save_user_agent()
-        sys.exit()
-    elif command == "configure":
-        g.input_keys()
-        sys.exit()
     elif command == 'user':
         things = g.user(query)
+    elif command == 'users':
+        from garc.accounts import AccountResolver
+        usernames = queries if args.from_file else [query]
+        things = AccountResolver(g, concurrency=args.concurrency).lookup(usernames)
 
+    elif command == 'userposts' and args.from_file:
+        things = crawler.userposts(
+            queries,
+            gabs=args.number_gabs,
+            gabs_after=args.gabs_after,
+            gabs_before=args.gabs_before,
+            checkpoints=checkpoints,
+            marks=marks
+        )
     elif command == 'userposts':
         things = g.userposts(
             query,
             gabs=args.number_gabs,
-            gabs_after=args.gabs_after
+            gabs_after=args.gabs_after,
+            gabs_before=args.gabs_before,
+            checkpoint=checkpoint(query),
+            since=since(query)
         )
+    elif command == 'usercomments' and args.from_file:
+        things = crawler.usercomments(queries, checkpoints=checkpoints, marks=marks,
+                                      gabs_after=args.gabs_after,
+                                      gabs_before=args.gabs_before)
     elif command == 'usercomments':
-        things = g.usercomments(query)
+        things = g.usercomments(query, checkpoint=checkpoint(query),
+                                since=since(query),
+                                gabs_after=args.gabs_after,
+                                gabs_before=args.gabs_before)
     elif command == 'followers':
         things = g.followers(query)
     elif command == 'following':
         things = g.following(query)
+    elif command == 'publicsearch' and args.fanout:
+        # one pass over the timeline, each query written to its own file
+        outputs = dict((name, writer(name)) for name in subscriptions)
+        try:
+            for name, thing in g.public_fanout(subscriptions, gabs=args.number_gabs,
+                                               gabs_after=args.gabs_after,
+                                               gabs_before=args.gabs_before):
+                if archive:
+                    archive.write(thing)
+                outputs[name].write(thing)
+                g.metrics.count('items')
+                if not args.no_item_log:
+                    logging.info("archived %s to %s", thing['id'], name)
+        finally:
+            for output in outputs.values():
+                output.close()
+            if archive:
+                archive.close()
+        sys.exit()
     elif command == 'publicsearch':
+        # all the terms of a file are matched in one pass over the timeline
         things = g.public_search(
-            query,
-            gabs=args.number_gabs
+            queries if args.from_file else query,
+            gabs=args.number_gabs,
+            gabs_after=args.gabs_after,
+            gabs_before=args.gabs_before,
+            checkpoint=checkpoint(query)
         )
+    elif command == 'stream':
+        timeline = args.timeline or ('hashtag' if query else 'public')
+        things = g.stream(timeline, query, gabs=args.number_gabs)
     elif command == 'top':
         things = g.top(timespan=query if query else None)
 
@@ -110,24 +477,102 @@ def main():
         print("\nFor example:\n\n    garc search make america great again")
         sys.exit(1)
 
-    # get the output filehandle
-    if args.output:
-        fh = codecs.open(args.output, 'wb', 'utf8')
-    else:
-        fh = sys.stdout
 
+    # replace gabs by the whole conversations they belong to
+    if args.expand_threads:
+        from garc.threads import ThreadExpander
+        if command not in statuses:
+            sys.exit("--expand-threads works with: %s" % ", ".join(statuses))
+        things = ThreadExpander(g, concurrency=args.concurrency).expand(things)
+
+    # ctrl-c exits from anywhere in here, what was collected is still written
+    try:
+        for thing in things:
+            if archive:
+                archive.write(thing)
+            if seen and seen.seen(thing['id']):
+                continue
+            out.write(thing)
+            g.metrics.count('items')
+            if not args.no_item_log:
+                logging.info("archived %s", thing['id'])
+    except ValueError as e:
+        # unknown accounts and failed follower pages
+        sys.exit(str(e))
+    finally:
+        # the index flushes the output before committing
+        if seen:
+            seen.close()
+        out.close()
+        if archive:
+            archive.close()
+    logging.info("wrote %s items, %.0f items/s", out.items, out.rate())
+
+    stats = g.connection_stats()
+    logging.info("%s requests, %s reused connections, %s new connections",
+                 stats['requests'], stats['reused_connections'],
+                 stats['new_connections'])
+    stats = g.retry_policy.stats()
+    logging.info("%s retries, %.1f seconds backing off",
+                 stats['retries'], stats['backoff_seconds'])
+    if g.cache:
+        stats = g.cache.stats()
+        logging.info("%s responses from the cache, %s revalidated, %s fetched",
+                     stats['hits'], stats['revalidated'], stats['misses'])
+        g.cache.close()
+
+def parse_size(size):
+    """
+    Parse a size in bytes with an optional K, M or G suffix.
+    """
+    units = {'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3}
+    size = size.strip().upper()
+    if size and size[-1] in units:
+        return int(float(size[:-1]) * units[size[-1]])
+    return int(size)
+
+def read_queries(path):
+    """
+    Read one username or hashtag per line, skipping blank lines.
+    """
+    return [q.lstrip('@') for q in read_terms(path)]
 
-    
-    for thing in things:
-        if args.format == "json":
-            print(json.dumps(thing), file=fh)
-        logging.info("archived %s", thing['id'])
+def read_terms(path):
+    """
+    Read one search term per line as it is, skipping blank lines.
+    """
+    with codecs.open(path, 'r', 'utf8') as fh:
+        return [line.strip() for line in fh if line.strip()]
 
-        # if 'post' in thing or 'username' in thing:
-        #     # gabs and users
-        #     if args.format == "json":
-        #         print(json.dumps(thing), file=fh)
-        #     logging.info("archived %s", thing['id'])
+def check_terms(terms):
+    """
+    Exit with a message when one of the search terms is not a valid
+    regular expression.
+    """
+    import re
+    for term in terms:
+        try:
+            re.compile(term, re.IGNORECASE)
+        except re.error as e:
+            sys.exit("invalid search term %s: %s" % (term, e))
+
+def read_subscriptions(path):
+    """
+    Read a file of "<output file> <term>" lines into a dictionary of output
+    files and their terms. An output file can be given several terms.
+    """
+    subscriptions = {}
+    with codecs.open(path, 'r', 'utf8') as fh:
+        for number, line in enumerate(fh, 1):
+            if not line.strip():
+                continue
+            parts = line.strip().split(None, 1)
+            if len(parts) < 2:
+                sys.exit("%s line %s: expected an output file and a search term"
+                         % (path, number))
+            output, term = parts
+            subscriptions.setdefault(output, []).append(term)
+    return subscriptions
 
 def get_argparser():
     """
@@ -149,24 +594,112 @@ def get_argparser():
                         help="Name of a profile in your configuration file")
     parser.add_argument('--warnings', action='store_true',
                         help="Include warning messages in output")
-    parser.add_argument("--connection_errors", type=int, default="0",
+    parser.add_argument("--connection_errors", type=int, default="5",
                         help="Number of connection errors before giving up")
-    parser.add_argument("--http_errors", type=int, default="0",
+    parser.add_argument("--http_errors", type=int, default="5",
                         help="Number of http errors before giving up")
+    parser.add_argument("--base_url", default="https://gab.com",
+                        help="Gab server to use, such as a local mock server for benchmarks")
+    parser.add_argument("--pool_size", type=int, default=10,
+                        help="Number of keep-alive connections to pool per host")
+    parser.add_argument("--no_keep_alive", action="store_true",
+                        help="Close the connection after every request")
+    parser.add_argument("--cache", action="store", default=None,
+                        dest="cache",
+                        help="file to cache API responses in, repeated requests are answered from it")
+    parser.add_argument("--cache_size", action="store", type=parse_size, default="100M",
+                        dest="cache_size",
+                        help="size of the response cache, e.g. 100M")
+    parser.add_argument("--account_cache", action="store", default=None,
+                        help="file to keep the account ids of usernames in between runs")
+    parser.add_argument("--account_ttl", action="store", type=float, default=168,
+                        help="hours before a cached account id is looked up again")
+    parser.add_argument("--from-file", action="store", default=None,
+                        dest="from_file",
+                        help="file of usernames or hashtags, one per line, to collect concurrently")
+    parser.add_argument("--concurrency", action="store", type=int, default=4,
+                        dest="concurrency",
+                        help="number of timelines to collect at once with --from-file")
+    parser.add_argument("--shards", action="store", type=int, default=None,
+                        dest="shards",
+                        help="split the timeline into this many time ranges collected --concurrency at a time")
+    parser.add_argument("--per_host", action="store", type=int, default=4,
+                        dest="per_host",
+                        help="maximum concurrent requests to one host with --from-file")
+    parser.add_argument("--fanout", action="store", default=None,
+                        dest="fanout",
+                        help="file of \"<output file> <term>\" lines, publicsearch writes the matches of each term to its file")
+    parser.add_argument("--relation", action="store", default="following",
+                        dest="relation", choices=["following", "followers", "both"],
+                        help="connections the graph command follows")
+    parser.add_argument("--depth", action="store", type=int, default=2,
+                        dest="depth",
+                        help="how many hops from the seed accounts the graph command goes")
+    parser.add_argument("--max_accounts", action="store", type=int, default=None,
+                        dest="max_accounts",
+                        help="stop the graph command after crawling this many accounts")
+    parser.add_argument("--expand-threads", action="store_true",
+                        dest="expand_threads",
+                        help="collect the whole conversation of every gab that is part of one")
+    parser.add_argument("--timeline", action="store", default=None,
+                        dest="timeline", choices=["public", "hashtag", "user"],
+                        help="timeline to stream, defaults to the hashtag given as query or else public")
+    parser.add_argument("--resume", action="store_true",
+                        help="continue an interrupted crawl from the checkpoint next to --output")
+    parser.add_argument("--incremental", action="store_true",
+                        help="only collect gabs newer than the ones collected by the last run")
+    parser.add_argument("--state_file", action="store",
+                        default=os.path.join(os.path.expanduser("~"), ".garc_state"),
+                        dest="state_file",
+                        help="file where --incremental keeps the newest gab of each query")
+    parser.add_argument("--dedup", action="store", default=None,
+                        dest="dedup",
+                        help="index file of gabs already collected, gabs in it are not written again")
+    parser.add_argument("--archive", action="store", default=None,
+                        dest="archive",
+                        help="SQLite archive that gabs are added to, and that the query command searches")
+    parser.add_argument("--account", action="store", default=None,
+                        dest="account",
+                        help="only query the gabs of this account")
+    parser.add_argument("--tag", action="store", default=None,
+                        dest="tag",
+                        help="only query the gabs with this hashtag")
     parser.add_argument("--output", action="store", default=None,
                         dest="output", help="write output to file path")
     parser.add_argument("--format", action="store", default="json",
-                        dest="format", choices=["json"],
-                        help="set output format")
+                        dest="format", choices=sorted(formats),
+                        help="set output format, csv and parquet flatten statuses into columns")
+    parser.add_argument("--fields", action="store", default=None,
+                        help="comma separated fields of the gabs to keep, e.g. id,created_at,account.acct,body")
+    parser.add_argument("--compress", action="store", default=None,
+                        dest="compress", choices=["gzip", "zstd"],
+                        help="compress the output, implied by a .gz or .zst output file")
+    parser.add_argument("--rotate_items", action="store", type=int, default=None,
+                        dest="rotate_items",
+                        help="start a new output file after this many items")
+    parser.add_argument("--rotate_size", action="store", type=parse_size, default=None,
+                        dest="rotate_size",
+                        help="start a new output file after this much data, e.g. 500M")
+    parser.add_argument("--no_item_log", action="store_true",
+                        help="don't log every archived item")
+    parser.add_argument("--progress", action="store_true",
+                        help="show a progress line on stderr")
+    parser.add_argument("--metrics", action="store", default=None,
+                        help="save request, item and retry metrics to this JSON file")
+    parser.add_argument("--metrics_port", action="store", type=int, default=None,
+                        help="serve metrics for Prometheus on this port at /metrics")
     parser.add_argument("--search_type", action="store", default="date",
                         dest="search_type", choices=["date"],
                         help="set search type")
     parser.add_argument("--number_gabs", action="store", type=int, default=-1,
                         dest="number_gabs",
                         help="approximate number of gabs to return")
-    parser.add_argument("--gabs_after", action="store", default="2000-01-01",
+    parser.add_argument("--gabs_after", action="store", default=None,
                         dest="gabs_after",
-                        help="approximate date of earliest gab you wish to collect")
+                        help="date of the earliest gab you wish to collect")
+    parser.add_argument("--gabs_before", action="store", default=None,
+                        dest="gabs_before",
+                        help="date the gabs you wish to collect were created before")
 
 
     return parser
@@ -0,0 +1,66 @@
+"""
+Login cookies saved between runs so that every run doesn't sign in again.
+"""
+import os
+import json
+import time
+import logging
+
+
+class CookieStore(object):
+    """
+    The cookies of a signed in account, kept in a JSON file only readable
+    by the user. Cookies are saved with their expiry time, and a saved
+    login is only used while none of its cookies have expired and for the
+    account it was made with.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    @classmethod
+    def for_config(cls, config, profile):
+        """
+        The cookie store of a profile, next to the config file.
+        """
+        return cls("%s.%s.cookies" % (config, profile))
+
+    def load(self, account):
+        """
+        The saved cookie jar of account, None if there is no usable one.
+        """
+        try:
+            with open(self.path) as fh:
+                data = json.load(fh)
+        except (IOError, OSError, ValueError):
+            return None
+        if data.get('account') != account or not data.get('cookies'):
+            return None
+        from requests.cookies import RequestsCookieJar, create_cookie
+        now = time.time()
+        jar = RequestsCookieJar()
+        for cookie in data['cookies']:
+            if cookie.get('expires') and cookie['expires'] <= now:
+                logging.info("saved login cookies in %s have expired", self.path)
+                return None
+            jar.set_cookie(create_cookie(**cookie))
+        logging.info("using saved login cookies from %s", self.path)
+        return jar
+
+    def save(self, account, jar):
+        cookies = [{'name': c.name, 'value': c.value, 'domain': c.domain,
+                    'path': c.path, 'expires': c.expires, 'secure': c.secure}
+                   for c in jar]
+        tmp = self.path + '.tmp'
+        try:
+            fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, 'w') as fh:
+                json.dump({'account': account, 'saved_at': time.time(),
+                           'cookies': cookies}, fh)
+            os.replace(tmp, self.path)
+        except (IOError, OSError) as e:
+            logging.warn("unable to save login cookies to %s: %s", self.path, e)
+
+    def clear(self):
+        if os.path.isfile(self.path):
+            os.remove(self.path)
@@ -0,0 +1,196 @@
+"""
+Asyncio engine that collects many Gab timelines at once.
+"""
+import asyncio
+import logging
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+
+class Deferred(object):
+    """
+    A Checkpoint or HighWaterMark of a timeline crawled in a worker thread.
+    Its updates are held in pending, shared by the timeline, instead of
+    being made straight away, so that the crawler can pass them along
+    behind the posts of the page they record and make them once those
+    posts have been handed out.
+    """
+
+    updates = ('page', 'forward', 'finish', 'advance')
+
+    def __init__(self, target, pending):
+        self.target = target
+        self.pending = pending
+
+    def __getattr__(self, name):
+        value = getattr(self.target, name)
+        if name in self.updates:
+            return lambda *args: self.pending.append(functools.partial(value, *args))
+        return value
+
+
+class Update(object):
+    """
+    A held back update, queued behind the posts it covers.
+    """
+
+    __slots__ = ('apply',)
+
+    def __init__(self, apply):
+        self.apply = apply
+
+
+class AsyncCrawler(object):
+    """
+    Paginate many Garc timelines concurrently and merge them into a single
+    stream of posts.
+
+    Each timeline is one of the regular Garc generators (userposts, search,
+    ...), so every page is still fetched through the Garc client. The
+    crawler runs up to `concurrency` timelines at the same time, the limit
+    on concurrent requests per host comes from the client's connection pool
+    (see the pool_maxsize and pool_block arguments of Garc).
+
+    Checkpoints and high-water marks of the timelines are updated by the
+    consumer of the merged stream, when it asks for the post after the
+    last one of a page, so they never get ahead of what was written out.
+    Timelines that have them are queued a whole page at a time.
+    """
+
+    def __init__(self, garc, concurrency=4, queue_size=1000):
+        self.garc = garc
+        self.concurrency = concurrency
+        self.queue_size = queue_size
+
+    def userposts(self, usernames, checkpoints=None, marks=None, **kwargs):
+        """
+        Collect the posts of every username, see Garc.userposts.
+        """
+        return self.run(self.timelines(self.garc.userposts, usernames, kwargs, checkpoints, marks))
+
+    def usercomments(self, usernames, checkpoints=None, marks=None, **kwargs):
+        """
+        Collect the comments of every username, see Garc.usercomments.
+        """
+        return self.run(self.timelines(self.garc.usercomments, usernames, kwargs, checkpoints, marks))
+
+    def search(self, hashtags, checkpoints=None, marks=None, **kwargs):
+        """
+        Collect the posts of every hashtag, see Garc.search.
+        """
+        return self.run(self.timelines(self.garc.search, hashtags, kwargs, checkpoints, marks))
+
+    def timelines(self, method, queries, kwargs, checkpoints=None, marks=None):
+        """
+        A (name, callable, pending) triple per query, each with its own
+        Checkpoint and HighWaterMark when a CheckpointStore or
+        HighWaterMarks is given, whose updates are held in pending.
+        Without either pending is None and posts are queued one by one.
+        """
+        timelines = []
+        for q in queries:
+            pending = [] if checkpoints or marks else None
+            if checkpoints:
+                kwargs = dict(kwargs, checkpoint=Deferred(checkpoints.checkpoint(q), pending))
+            if marks:
+                kwargs = dict(kwargs, since=Deferred(marks.mark(q), pending))
+            timelines.append((q, functools.partial(method, q, **kwargs), pending))
+        return timelines
+
+    def run(self, timelines):
+        """
+        Synchronous generator over the merged output of crawl(), for use
+        outside of an event loop.
+        """
+        loop = asyncio.new_event_loop()
+        posts = self.crawl(timelines)
+        try:
+            while True:
+                try:
+                    yield loop.run_until_complete(posts.__anext__())
+                except StopAsyncIteration:
+                    break
+        finally:
+            # ctrl-c can stop the loop while crawl() waits for a post, its
+            # task has to be cancelled before the generator can be closed
+            loop.run_until_complete(cancel(asyncio.all_tasks(loop)))
+            loop.run_until_complete(posts.aclose())
+            loop.close()
+
+    async def crawl(self, timelines):
+        """
+        Asynchronous generator of the posts of every timeline. Timelines are
+        (name, callable) pairs where the callable returns a Garc generator,
+        or (name, callable, pending) triples where pending is the list the
+        Deferred updates of the timeline are held in.
+        """
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(self.queue_size)
+        limit = asyncio.Semaphore(self.concurrency)
+        whole = asyncio.Lock()
+        executor = ThreadPoolExecutor(self.concurrency)
+        done = object()
+
+        async def put(page, pending):
+            # a page goes into the queue in one piece with the updates that
+            # record it, so the output is made of whole recorded pages when
+            # a checkpoint is saved
+            async with whole:
+                for post in page:
+                    await queue.put(post)
+                while pending:
+                    await queue.put(Update(pending.pop(0)))
+            del page[:]
+
+        async def drain(name, timeline, pending=None):
+            async with limit:
+                logging.info("crawling %s", name)
+                page = []
+                try:
+                    posts = await loop.run_in_executor(executor, timeline)
+                    while True:
+                        post = await loop.run_in_executor(executor, next, posts, done)
+                        # the updates made while fetching the next page
+                        # record the posts held so far
+                        if pending:
+                            await put(page, pending)
+                        if post is done:
+                            break
+                        if pending is None:
+                            await queue.put(post)
+                        else:
+                            page.append(post)
+                except Exception as e:
+                    logging.error("crawl of %s failed: %s", name, e)
+                await put(page, pending or [])
+
+        async def finish(tasks):
+            await asyncio.gather(*tasks)
+            await queue.put(done)
+
+        tasks = [asyncio.ensure_future(drain(*timeline)) for timeline in timelines]
+        finisher = asyncio.ensure_future(finish(tasks))
+        try:
+            while True:
+                post = await queue.get()
+                if post is done:
+                    break
+                if isinstance(post, Update):
+                    # the posts before it have been handed out and written
+                    post.apply()
+                    continue
+                yield post
+        finally:
+            for task in tasks + [finisher]:
+                task.cancel()
+            await asyncio.gather(finisher, *tasks, return_exceptions=True)
+            executor.shutdown(wait=False)
+
+
+async def cancel(tasks):
+    """
+    Cancel tasks and wait for them to finish.
+    """
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
@@ -0,0 +1,85 @@
+"""
+A persistent index of the statuses already written out, shared by runs.
+"""
+import sqlite3
+import logging
+import threading
+
+
+class SeenIndex(object):
+    """
+    The ids of every status written out, kept in a SQLite file so that a
+    status collected again by another run, another query or a page that
+    came back out of order is only written once. Ids are stored as the
+    integer keys of the table, so the index stays on disk and only a
+    bounded page cache (cache_size kilobytes) is held in memory, however
+    many ids it holds.
+
+    Additions are committed every commit_every new ids, or only when
+    commit() is called if commit_every is None, so the index can be kept
+    in step with a checkpointed output file. sync is called before every
+    commit, it should flush the output so the index never gets ahead of
+    it.
+    """
+
+    def __init__(self, path, commit_every=10000, cache_size=32768, sync=None):
+        self.path = path
+        self.commit_every = commit_every
+        self.sync = sync
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.execute('PRAGMA synchronous=NORMAL')
+        self.db.execute('PRAGMA cache_size=-%d' % cache_size)
+        self.db.execute('CREATE TABLE IF NOT EXISTS seen (id INTEGER PRIMARY KEY)')
+        self.db.commit()
+        self.lock = threading.Lock()
+        self.pending = 0
+        self.skipped = 0
+
+    def seen(self, status_id):
+        """
+        True if the status was seen before, otherwise it is added to the
+        index and False is returned. Ids that aren't numbers are never
+        considered seen.
+        """
+        try:
+            status_id = int(status_id)
+        except (TypeError, ValueError):
+            return False
+        with self.lock:
+            # commit before adding so that every committed id was written
+            if self.commit_every and self.pending >= self.commit_every:
+                self._commit()
+            try:
+                cursor = self.db.execute('INSERT OR IGNORE INTO seen (id) VALUES (?)', (status_id,))
+            except OverflowError:
+                return False
+            if not cursor.rowcount:
+                self.skipped += 1
+                return True
+            self.pending += 1
+        return False
+
+    def _commit(self):
+        if self.sync:
+            self.sync()
+        self.db.commit()
+        self.pending = 0
+
+    def commit(self):
+        with self.lock:
+            self._commit()
+
+    def close(self):
+        """
+        Commit the new ids and close the index. When commits are left to
+        commit() the ids added since the last one are rolled back instead,
+        their gabs may not be in the output the index is kept in step with.
+        """
+        with self.lock:
+            if self.commit_every is None:
+                self.db.rollback()
+            else:
+                self._commit()
+        self.db.close()
+        logging.info("skipped %s gabs already in %s", self.skipped, self.path)
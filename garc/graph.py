@@ -0,0 +1,186 @@
+"""
+Breadth first crawls of the follower graph, resumable from disk.
+"""
+import os
+import json
+import sqlite3
+import logging
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS accounts (
+    id INTEGER PRIMARY KEY,
+    depth INTEGER,
+    done INTEGER DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS accounts_frontier ON accounts (done, depth);
+CREATE TABLE IF NOT EXISTS edges (
+    follower INTEGER,
+    followed INTEGER,
+    PRIMARY KEY (follower, followed)
+) WITHOUT ROWID;
+"""
+
+
+class GraphCrawler(object):
+    """
+    Collect the follower graph around some seed accounts, breadth first,
+    up to depth hops away: the seeds are depth 0 and the accounts they
+    are connected to depth 1. With relations ('following',) the accounts
+    followed are crawled, with ('followers',) the followers, or both.
+
+    Edges are written to the output as "follower followed" lines of
+    account ids. The frontier of accounts still to crawl and the set of
+    accounts already seen are kept in a SQLite file next to the output
+    (output + '.graph'), together with how much of the output had been
+    written when the last account was finished, so that an interrupted
+    crawl can be resumed without repeating or losing edges. Accounts are
+    crawled concurrently, and the edges of an account are written out
+    together once all of its pages have been collected.
+
+    With both relations an edge between two crawled accounts is found
+    from both ends, the edges written are kept in the state file too and
+    each one is only written once.
+    """
+
+    def __init__(self, garc, output, relations=('following',), depth=1,
+                 concurrency=4, max_accounts=None):
+        self.garc = garc
+        self.output = output
+        self.path = output + '.graph'
+        self.relations = list(relations)
+        self.depth = depth
+        self.concurrency = concurrency
+        self.max_accounts = max_accounts
+        self.db = None
+        self.out = None
+        self.crawled = 0
+        self.edges = 0
+
+    def params(self, seeds):
+        return {'seeds': list(seeds), 'relations': self.relations, 'depth': self.depth}
+
+    def open(self, seeds, resume=False):
+        """
+        Start a crawl from seeds (usernames or ids), or with resume carry
+        on with the crawl in the state file, which must have been made
+        with the same seeds, relations and depth.
+        """
+        exists = os.path.isfile(self.path)
+        if exists and not resume:
+            os.remove(self.path)
+        self.db = sqlite3.connect(self.path)
+        self.db.executescript(SCHEMA)
+        meta = dict(self.db.execute('SELECT key, value FROM meta'))
+        if resume and exists:
+            if json.loads(meta['params']) != self.params(seeds):
+                raise ValueError("graph state %s was made with different parameters: %s"
+                                 % (self.path, meta['params']))
+            self.out = open(self.output, 'r+b')
+            self.out.truncate(int(meta['offset']))
+            self.out.seek(0, os.SEEK_END)
+            logging.info("resuming graph crawl from %s", self.path)
+        else:
+            self.out = open(self.output, 'wb')
+            self.db.execute('INSERT INTO meta VALUES (?, ?)', ('params', json.dumps(self.params(seeds))))
+            self.db.execute('INSERT INTO meta VALUES (?, ?)', ('offset', '0'))
+            self.db.executemany('INSERT OR IGNORE INTO accounts (id, depth) VALUES (?, 0)',
+                                [(int(self.garc.account_id(seed)),) for seed in seeds])
+            self.db.commit()
+
+    def frontier(self, limit, exclude):
+        """
+        The next accounts to crawl, closest to the seeds first.
+        """
+        rows = self.db.execute('SELECT id, depth FROM accounts WHERE done = 0 '
+                               'ORDER BY depth, id LIMIT ?', (limit + len(exclude),))
+        return [(i, d) for i, d in rows if i not in exclude][:limit]
+
+    def neighbours(self, account_id):
+        """
+        The edges and the connected account ids of an account.
+        """
+        edges = []
+        ids = []
+        for relation in self.relations:
+            for account in self.garc.connections(account_id, relation):
+                other = int(account['id'])
+                ids.append(other)
+                if relation == 'following':
+                    edges.append((account_id, other))
+                else:
+                    edges.append((other, account_id))
+        return edges, ids
+
+    def finish(self, account_id, depth, edges, ids):
+        """
+        Write out the edges of a crawled account and queue its neighbours,
+        committing both together.
+        """
+        if len(self.relations) > 1:
+            edges = [edge for edge in edges if self.db.execute(
+                'INSERT OR IGNORE INTO edges VALUES (?, ?)', edge).rowcount]
+        self.out.write(''.join('%s %s\n' % edge for edge in edges).encode('utf8'))
+        self.out.flush()
+        if depth + 1 < self.depth:
+            # accounts finish out of order, a neighbour already queued from
+            # a deeper account keeps the shallower depth
+            self.db.executemany('INSERT INTO accounts (id, depth) VALUES (?, ?) '
+                                'ON CONFLICT(id) DO UPDATE SET depth = min(depth, excluded.depth) '
+                                'WHERE done = 0',
+                                [(i, depth + 1) for i in ids])
+        self.db.execute('UPDATE accounts SET done = 1 WHERE id = ?', (account_id,))
+        self.db.execute("UPDATE meta SET value = ? WHERE key = 'offset'", (str(self.out.tell()),))
+        self.db.commit()
+        self.crawled += 1
+        self.edges += len(edges)
+        self.garc.metrics.count('items', len(edges))
+        logging.info("crawled %s at depth %s, %s edges", account_id, depth, len(edges))
+
+    def crawl(self):
+        """
+        Crawl until the frontier is empty or max_accounts accounts have
+        been crawled.
+        """
+        executor = ThreadPoolExecutor(self.concurrency)
+        running = {}
+        try:
+            while True:
+                room = self.concurrency - len(running)
+                if self.max_accounts is not None:
+                    room = min(room, self.max_accounts - self.crawled - len(running))
+                if room > 0:
+                    busy = set(a for a, d in running.values())
+                    for account_id, depth in self.frontier(room, busy):
+                        future = executor.submit(self.neighbours, account_id)
+                        running[future] = (account_id, depth)
+                if not running:
+                    break
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    account_id, depth = running.pop(future)
+                    try:
+                        edges, ids = future.result()
+                    except Exception as e:
+                        # leave it in the frontier for the next resume
+                        logging.error("crawl of %s failed: %s", account_id, e)
+                        self.db.execute('UPDATE accounts SET done = -1 WHERE id = ?', (account_id,))
+                        self.db.commit()
+                        continue
+                    self.finish(account_id, depth, edges, ids)
+        finally:
+            executor.shutdown(wait=False)
+        logging.info("crawled %s accounts, %s edges", self.crawled, self.edges)
+
+    def close(self):
+        if self.out:
+            self.out.close()
+        if self.db:
+            # accounts that failed are tried again when resuming
+            self.db.execute('UPDATE accounts SET done = 0 WHERE done = -1')
+            self.db.commit()
+            self.db.close()
@@ -0,0 +1,155 @@
+"""
+Match many search terms against the text of posts in a single pass.
+"""
+import re
+
+from .text import html_to_text
+
+REGEX_CHARS = frozenset('.^$*+?{}[]\\|()')
+
+# global flags, backreferences and named groups change meaning or fail to
+# compile once a pattern is part of a larger one
+UNMERGEABLE = re.compile(r'\(\?[aiLmsux]+\)|\\[1-9]|\\g<|\(\?P[<=]')
+
+
+def mergeable(term):
+    """
+    Whether the regex term means the same inside an alternation of others.
+    """
+    if UNMERGEABLE.search(term):
+        return False
+    try:
+        re.compile('(?:%s)' % term)
+    except re.error:
+        return False
+    return True
+
+
+def trie_pattern(words):
+    """
+    A regular expression matching any of words, built from a trie of the
+    words so that they share their prefixes. The regex engine only has to
+    try the first characters of the words at each position of the text,
+    however many words there are.
+    """
+    trie = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[''] = {}
+
+    def build(node):
+        alternatives = [re.escape(ch) + build(child)
+                        for ch, child in sorted(node.items()) if ch]
+        if not alternatives:
+            return ''
+        if len(alternatives) == 1:
+            pattern = alternatives[0]
+        else:
+            pattern = '(?:%s)' % '|'.join(alternatives)
+        if '' in node:
+            pattern = '(?:%s)?' % pattern
+        return pattern
+
+    return build(trie)
+
+
+class Matcher(object):
+    """
+    Compile a list of search terms once and report which of them occur in
+    a post. Matching is case insensitive and done on the text of the post,
+    not its HTML.
+
+    Plain words and phrases are compiled together into one trie shaped
+    regex, terms that use regular expression syntax into one alternation,
+    apart from those with global flags, backreferences or named groups,
+    which are searched for one by one.
+    With literal=True every term is taken as plain text. Most posts
+    match neither and cost a single scan each; only posts that do match
+    are examined further to find every term they contain.
+    """
+
+    def __init__(self, terms, literal=False):
+        if isinstance(terms, str):
+            terms = [terms]
+        self.terms = list(terms)
+        self.literals = {}
+        self.patterns = []
+        self.separate = []
+        for term in self.terms:
+            if term and (literal or not REGEX_CHARS.intersection(term)):
+                self.literals.setdefault(term.lower(), []).append(term)
+            elif mergeable(term):
+                self.patterns.append((term, re.compile(term, re.IGNORECASE)))
+            else:
+                self.separate.append((term, re.compile(term, re.IGNORECASE)))
+
+        self.literal_search = self.literal_scan = self.regex_search = None
+        if self.literals:
+            trie = trie_pattern(self.literals)
+            self.literal_search = re.compile(trie, re.IGNORECASE)
+            # a lookahead finds terms that start inside another match
+            self.literal_scan = re.compile('(?=(%s))' % trie, re.IGNORECASE)
+        if self.patterns:
+            self.regex_search = re.compile(
+                '|'.join('(?:%s)' % p.pattern for _, p in self.patterns),
+                re.IGNORECASE)
+
+    def match_text(self, text):
+        """
+        The terms that occur in text, in the order they were given.
+        """
+        found = set()
+        if self.literal_search:
+            first = self.literal_search.search(text)
+            if first:
+                for m in self.literal_scan.finditer(text, first.start()):
+                    # terms that are a prefix of the longest match are there too
+                    longest = m.group(1).lower()
+                    for end in range(1, len(longest) + 1):
+                        found.update(self.literals.get(longest[:end], ()))
+        if self.regex_search and self.regex_search.search(text):
+            found.update(t for t, p in self.patterns if p.search(text))
+        found.update(t for t, p in self.separate if p.search(text))
+        if not found:
+            return []
+        return [t for t in self.terms if t in found]
+
+    def match(self, post):
+        """
+        The terms that occur in the text of a post.
+        """
+        return self.match_text(html_to_text(post['content']))
+
+
+class Router(object):
+    """
+    Route posts to many named queries, each made of one or more terms.
+    The terms of all the queries go into a single Matcher, so adding
+    queries does not add passes over the posts.
+    """
+
+    def __init__(self, queries):
+        self.names = {}
+        terms = []
+        for name, query_terms in queries.items():
+            if isinstance(query_terms, str):
+                query_terms = [query_terms]
+            for term in query_terms:
+                if term not in self.names:
+                    self.names[term] = []
+                    terms.append(term)
+                self.names[term].append(name)
+        self.queries = list(queries)
+        self.matcher = Matcher(terms)
+
+    def route(self, terms):
+        """
+        The (name, terms) pairs of the queries that matched terms belong to.
+        """
+        routed = {}
+        for term in terms:
+            for name in self.names.get(term, ()):
+                routed.setdefault(name, []).append(term)
+        return [(name, routed[name]) for name in self.queries if name in routed]
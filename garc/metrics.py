@@ -0,0 +1,281 @@
+"""
+Counters and latency histograms of a crawl, shown as a progress line and
+exported as JSON or in the Prometheus text format.
+"""
+import re
+import sys
+import json
+import time
+import bisect
+import logging
+import threading
+
+try:
+    from urllib.parse import urlsplit
+except ImportError:
+    from urlparse import urlsplit
+
+# upper bounds of the latency buckets, in seconds
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+# urls are grouped by endpoint with their usernames, tags and ids replaced
+ENDPOINTS = [
+    (re.compile(r'/timelines/tag/[^/]+'), '/timelines/tag/:tag'),
+    (re.compile(r'/account_by_username/[^/]+'), '/account_by_username/:username'),
+    (re.compile(r'/\d+(?=/|$)'), '/:id')
+]
+
+
+def endpoint(url):
+    """
+    The endpoint of a url: its path without the query string, usernames,
+    tags or ids.
+    """
+    path = urlsplit(url).path
+    for pattern, replacement in ENDPOINTS:
+        path = pattern.sub(replacement, path)
+    return path
+
+
+class Histogram(object):
+    """
+    Counts of observations in the buckets of BUCKETS, plus their sum.
+    """
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q):
+        """
+        The upper bound of the bucket the q quantile falls in.
+        """
+        if not self.count:
+            return 0
+        rank = q * self.count
+        total = 0
+        for bound, count in zip(self.buckets, self.counts):
+            total += count
+            if total >= rank:
+                return bound
+        return float('inf')
+
+    def summary(self):
+        return {
+            'count': self.count,
+            'seconds': round(self.sum, 3),
+            'p50': self.quantile(0.5),
+            'p90': self.quantile(0.9),
+            'p99': self.quantile(0.99)
+        }
+
+
+class Metrics(object):
+    """
+    What a crawl has done so far: a latency histogram, the bytes received
+    and the status codes of the requests to each endpoint, named counters
+    (items written, statuses fetched, ...) and the time spent formatting
+    posts. Other parts of garc that keep their own statistics are added
+    with add_source and included in the exports. Thread safe.
+    """
+
+    def __init__(self):
+        self.started = time.time()
+        self.lock = threading.Lock()
+        self.latency = {}
+        self.bytes = {}
+        self.statuses = {}
+        self.counters = {}
+        self.sources = {}
+
+    def request(self, url, seconds, size, status):
+        """
+        Record a response from the network.
+        """
+        name = endpoint(url)
+        with self.lock:
+            if name not in self.latency:
+                self.latency[name] = Histogram()
+                self.bytes[name] = 0
+            self.latency[name].observe(seconds)
+            self.bytes[name] += size
+            key = (name, status)
+            self.statuses[key] = self.statuses.get(key, 0) + 1
+
+    def count(self, name, value=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def add_source(self, name, stats):
+        """
+        Include the dictionary of numbers returned by stats() in the
+        exports, prefixed with name.
+        """
+        self.sources[name] = stats
+
+    def totals(self):
+        """
+        The headline numbers of the progress line.
+        """
+        with self.lock:
+            requests = sum(self.statuses.values())
+            rate_limited = sum(n for (name, status), n in self.statuses.items() if status == 429)
+            received = sum(self.bytes.values())
+            items = self.counters.get('items', 0)
+            fetched = self.counters.get('statuses_fetched', 0)
+        elapsed = time.time() - self.started
+        return {
+            'seconds': elapsed,
+            'items': items,
+            'items_per_second': items / elapsed if elapsed else 0,
+            'statuses_fetched': fetched,
+            'requests': requests,
+            'rate_limited': rate_limited,
+            'bytes': received
+        }
+
+    def summary(self):
+        """
+        Everything as a dictionary that can be dumped as JSON.
+        """
+        with self.lock:
+            endpoints = {}
+            for name, histogram in self.latency.items():
+                endpoints[name] = dict(histogram.summary(), bytes=self.bytes[name], statuses={})
+            for (name, status), n in self.statuses.items():
+                endpoints[name]['statuses'][str(status)] = n
+            counters = dict(self.counters)
+        summary = self.totals()
+        summary['counters'] = counters
+        summary['endpoints'] = endpoints
+        for name, stats in self.sources.items():
+            summary[name] = stats()
+        return summary
+
+    def prometheus(self):
+        """
+        Everything in the Prometheus text exposition format.
+        """
+        lines = []
+
+        def metric(name, kind, help):
+            lines.append('# HELP garc_%s %s' % (name, help))
+            lines.append('# TYPE garc_%s %s' % (name, kind))
+
+        with self.lock:
+            metric('request_duration_seconds', 'histogram', 'Latency of requests to Gab.')
+            for name, histogram in sorted(self.latency.items()):
+                total = 0
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    total += count
+                    lines.append('garc_request_duration_seconds_bucket{endpoint="%s",le="%s"} %s'
+                                 % (name, bound, total))
+                lines.append('garc_request_duration_seconds_bucket{endpoint="%s",le="+Inf"} %s'
+                             % (name, histogram.count))
+                lines.append('garc_request_duration_seconds_sum{endpoint="%s"} %s' % (name, histogram.sum))
+                lines.append('garc_request_duration_seconds_count{endpoint="%s"} %s'
+                             % (name, histogram.count))
+            metric('response_bytes_total', 'counter', 'Bytes received from Gab.')
+            for name, size in sorted(self.bytes.items()):
+                lines.append('garc_response_bytes_total{endpoint="%s"} %s' % (name, size))
+            metric('responses_total', 'counter', 'Responses from Gab by status code.')
+            for (name, status), n in sorted(self.statuses.items()):
+                lines.append('garc_responses_total{endpoint="%s",status="%s"} %s' % (name, status, n))
+            counters = sorted(self.counters.items())
+        for name, value in counters:
+            metric('%s_total' % name, 'counter', name.replace('_', ' ').capitalize() + '.')
+            lines.append('garc_%s_total %s' % (name, value))
+        for source, stats in sorted(self.sources.items()):
+            for key, value in sorted(stats().items()):
+                metric('%s_%s' % (source, key), 'gauge', '%s %s.' % (source, key.replace('_', ' ')))
+                lines.append('garc_%s_%s %s' % (source, key, value))
+        return '\n'.join(lines) + '\n'
+
+    def save(self, path):
+        with open(path, 'w') as fh:
+            json.dump(self.summary(), fh, indent=2, sort_keys=True)
+
+
+class Progress(object):
+    """
+    A line on stderr, rewritten every interval seconds, with the items
+    written, gabs fetched, requests made and data received so far.
+    """
+
+    def __init__(self, metrics, interval=1, stream=None):
+        self.metrics = metrics
+        self.interval = interval
+        self.stream = stream or sys.stderr
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run)
+        self.thread.daemon = True
+
+    def line(self):
+        t = self.metrics.totals()
+        return "%s items, %.0f items/s, %s gabs fetched, %s requests, %s rate limited, %.1f MB, %ds" % (
+            t['items'], t['items_per_second'], t['statuses_fetched'], t['requests'],
+            t['rate_limited'], t['bytes'] / 1024.0 ** 2, t['seconds'])
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            self.stream.write('\r' + self.line())
+            self.stream.flush()
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.stopped.set()
+        self.thread.join()
+        self.stream.write('\r' + self.line() + '\n')
+        self.stream.flush()
+
+
+class MetricsServer(object):
+    """
+    Serve the metrics for Prometheus to scrape at http://host:port/metrics
+    from a background thread.
+    """
+
+    def __init__(self, metrics, port, host='127.0.0.1'):
+        # only imported when metrics are served
+        try:
+            from http.server import BaseHTTPRequestHandler, HTTPServer
+        except ImportError:
+            from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                body = metrics.prometheus().encode('utf8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = HTTPServer((host, port), Handler)
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.daemon = True
+
+    def start(self):
+        self.thread.start()
+        logging.info("serving metrics on http://%s:%s/metrics", *self.server.server_address[:2])
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
@@ -0,0 +1,407 @@
+"""
+Buffered writers for the items collected by garc.
+"""
+import io
+import os
+import sys
+import json
+import gzip
+import time
+import logging
+
+from .record import Record
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# pyarrow takes longer to import than the rest of garc, it is only
+# imported once a ParquetWriter is made
+pyarrow = None
+
+try:
+    import unicodecsv as csv
+except ImportError:
+    import csv
+
+COMPRESSION_SUFFIXES = {'.gz': 'gzip', '.zst': 'zstd'}
+
+
+def compression_for(path):
+    """
+    The compression implied by the extension of path, if any.
+    """
+    if not path:
+        return None
+    return COMPRESSION_SUFFIXES.get(os.path.splitext(path)[1])
+
+
+# the flattened columns of a status for csv and parquet, with their types
+COLUMNS = [
+    ('id', 'string'),
+    ('created_at', 'string'),
+    ('url', 'string'),
+    ('language', 'string'),
+    ('visibility', 'string'),
+    ('sensitive', 'bool'),
+    ('spoiler_text', 'string'),
+    ('in_reply_to_id', 'string'),
+    ('in_reply_to_account_id', 'string'),
+    ('reblog.id', 'string'),
+    ('account.id', 'string'),
+    ('account.username', 'string'),
+    ('account.acct', 'string'),
+    ('account.display_name', 'string'),
+    ('account.created_at', 'string'),
+    ('account.followers_count', 'int'),
+    ('account.following_count', 'int'),
+    ('account.statuses_count', 'int'),
+    ('body', 'string'),
+    ('replies_count', 'int'),
+    ('reblogs_count', 'int'),
+    ('favourites_count', 'int'),
+    ('tags', 'list'),
+    ('mentions', 'list'),
+    ('media_urls', 'list'),
+    ('card.url', 'string'),
+    ('matched_terms', 'list')
+]
+
+# list columns and where their values come from in a status
+LISTS = {
+    'tags': ('tags', 'name'),
+    'mentions': ('mentions', 'acct'),
+    'media_urls': ('media_attachments', 'url'),
+    'matched_terms': ('matched_terms', None)
+}
+
+
+def select_columns(fields):
+    """
+    The COLUMNS named in fields, in that order.
+    """
+    types = dict(COLUMNS)
+    unknown = [f for f in fields if f not in types]
+    if unknown:
+        raise ValueError("unknown columns %s, the columns are: %s"
+                         % (", ".join(unknown), ", ".join(name for name, kind in COLUMNS)))
+    return [(f, types[f]) for f in fields]
+
+
+def column_sources(columns):
+    """
+    The fields of a status that the values of columns come from.
+    """
+    return [LISTS[name][0] if kind == 'list' else name for name, kind in columns]
+
+
+def flatten(item, columns=COLUMNS):
+    """
+    The values of the columns of a status, None where it has no value.
+    """
+    if isinstance(item, Record):
+        item = item.as_dict()
+    row = []
+    for name, kind in columns:
+        if kind == 'list':
+            key, field = LISTS[name]
+            values = item.get(key) or []
+            if field:
+                values = [v.get(field) for v in values if isinstance(v, dict)]
+            row.append([v for v in values if v is not None])
+            continue
+        value = item
+        for part in name.split('.'):
+            value = value.get(part) if isinstance(value, dict) else None
+        if value is not None:
+            if kind == 'string':
+                value = str(value)
+            elif kind == 'int':
+                value = int(value)
+            elif kind == 'bool':
+                value = bool(value)
+        row.append(value)
+    return row
+
+
+def encode_json(item):
+    """
+    Serialize an item as a line of JSON, with orjson when it is installed.
+    """
+    if isinstance(item, Record):
+        item = item.as_dict()
+    if orjson is not None:
+        try:
+            return orjson.dumps(item) + b'\n'
+        except TypeError:
+            # orjson refuses integers beyond 64 bits, json does not
+            pass
+    return json.dumps(item).encode('utf8') + b'\n'
+
+
+class Writer(object):
+    """
+    Write items to a file, or stdout when there is no path, in batches.
+
+    Output can be compressed with gzip or zstd (taken from the .gz or .zst
+    extension of the path when not given) and rotated to a new file after
+    rotate_items items or rotate_bytes bytes of uncompressed data. Rotated
+    files are numbered: posts.json, posts-1.json, posts-2.json, ...
+
+    With flush_interval the batch is also written out and flushed once
+    that many seconds have passed since the last flush, 0 flushes every
+    item, so that slow streams show up in the output as they arrive.
+
+    Subclasses implement encode() to turn an item into bytes. Writers that
+    can't add to an existing file set appendable to False.
+    """
+
+    appendable = True
+
+    def __init__(self, path=None, compression=None, rotate_items=None,
+                 rotate_bytes=None, batch_size=1000, append=False, flush_interval=None):
+        self.path = path
+        self.compression = compression or compression_for(path)
+        if self.compression == 'zstd' and zstandard is None:
+            raise RuntimeError("zstd compression needs the zstandard package")
+        if self.compression and not path:
+            raise RuntimeError("compressed output needs an output file")
+        self.rotate_items = rotate_items
+        self.rotate_bytes = rotate_bytes
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.append = append
+        self.batch = []
+        self.part = 0
+        self.items = 0
+        self.file_items = 0
+        self.file_bytes = 0
+        self.started = time.time()
+        self.flushed = self.started
+        self.fh = self.open(self.path)
+
+    def part_path(self):
+        """
+        The path of the current file, numbered after the first rotation.
+        """
+        if not self.part:
+            return self.path
+        # keep compression suffixes after the number: posts-1.json.gz
+        root, ext = os.path.splitext(self.path)
+        suffix = ''
+        if ext in COMPRESSION_SUFFIXES:
+            suffix = ext
+            root, ext = os.path.splitext(root)
+        return "%s-%s%s%s" % (root, self.part, ext, suffix)
+
+    def open(self, path):
+        if not path:
+            return getattr(sys.stdout, 'buffer', sys.stdout)
+        mode = 'ab' if self.append else 'wb'
+        if self.compression == 'gzip':
+            return gzip.open(path, mode, compresslevel=6)
+        raw = open(path, mode)
+        if self.compression == 'zstd':
+            return zstandard.ZstdCompressor().stream_writer(raw, closefd=True)
+        return raw
+
+    def encode(self, item):
+        raise NotImplementedError
+
+    def size(self, data):
+        return len(data)
+
+    def write(self, item):
+        data = self.encode(item)
+        self.batch.append(data)
+        self.items += 1
+        self.file_items += 1
+        self.file_bytes += self.size(data)
+        if len(self.batch) >= self.batch_size:
+            self.flush_batch()
+        if self.flush_interval is not None and time.time() - self.flushed >= self.flush_interval:
+            self.flush()
+        if self.path and ((self.rotate_items and self.file_items >= self.rotate_items) or
+                          (self.rotate_bytes and self.file_bytes >= self.rotate_bytes)):
+            self.rotate()
+
+    def flush_batch(self):
+        if self.batch:
+            self.fh.write(b''.join(self.batch))
+            self.batch = []
+
+    def rotate(self):
+        self.close_file()
+        self.part += 1
+        self.file_items = 0
+        self.file_bytes = 0
+        self.append = False
+        self.fh = self.open(self.part_path())
+        logging.info("rotated output to %s", self.part_path())
+
+    def flush(self):
+        """
+        Write out the current batch and flush it to the file.
+        """
+        self.flush_batch()
+        self.fh.flush()
+        self.flushed = time.time()
+
+    def tell(self):
+        """
+        Size of the output after a flush, for checkpoints. Only plain
+        uncompressed files that aren't rotated can be resumed at a size.
+        """
+        if not self.path or self.compression or self.rotate_items or self.rotate_bytes:
+            return None
+        return self.fh.tell()
+
+    def close_file(self):
+        self.flush_batch()
+        if self.path:
+            self.fh.close()
+        else:
+            self.fh.flush()
+
+    def close(self):
+        self.close_file()
+
+    def rate(self):
+        """
+        Items written per second since the writer was opened.
+        """
+        elapsed = time.time() - self.started
+        return self.items / elapsed if elapsed else 0
+
+
+class JsonWriter(Writer):
+    """
+    Write items as JSON lines.
+    """
+
+    def encode(self, item):
+        return encode_json(item)
+
+
+class CsvWriter(Writer):
+    """
+    Write statuses as CSV rows of their flattened COLUMNS, or the given
+    columns, with a header row at the start of every file. Lists are
+    joined with spaces.
+    """
+
+    def __init__(self, path=None, columns=COLUMNS, **kwargs):
+        self.columns = columns
+        if csv.__name__ == 'unicodecsv':
+            self.buffer = io.BytesIO()
+            self.csv = csv.writer(self.buffer, encoding='utf8')
+        else:
+            self.buffer = io.StringIO()
+            self.csv = csv.writer(self.buffer)
+        super(CsvWriter, self).__init__(path, **kwargs)
+
+    def open(self, path):
+        fh = super(CsvWriter, self).open(path)
+        if not self.append:
+            fh.write(self.row([name for name, kind in self.columns]))
+        return fh
+
+    def row(self, values):
+        self.csv.writerow(values)
+        data = self.buffer.getvalue()
+        self.buffer.seek(0)
+        self.buffer.truncate()
+        if not isinstance(data, bytes):
+            data = data.encode('utf8')
+        return data
+
+    def encode(self, item):
+        return self.row([' '.join(v) if isinstance(v, list) else v
+                         for v in flatten(item, self.columns)])
+
+
+class ParquetWriter(Writer):
+    """
+    Write statuses to a Parquet file of their flattened COLUMNS (or the
+    given columns), one row group per batch, so that only a batch is held
+    in memory and readers can load just the columns they need.
+    compression is the codec used inside the file (snappy by default),
+    not a compression of the file.
+    """
+
+    appendable = False
+
+    def __init__(self, path=None, compression=None, batch_size=50000, columns=COLUMNS,
+                 **kwargs):
+        global pyarrow
+        if pyarrow is None:
+            try:
+                import pyarrow
+                import pyarrow.parquet
+            except ImportError:
+                raise RuntimeError("parquet output needs the pyarrow package")
+        if not path:
+            raise RuntimeError("parquet output needs an output file")
+        if kwargs.pop('append', False):
+            raise RuntimeError("parquet output can't be appended to")
+        self.codec = compression or 'snappy'
+        types = {
+            'string': pyarrow.string(),
+            'int': pyarrow.int64(),
+            'bool': pyarrow.bool_(),
+            'list': pyarrow.list_(pyarrow.string())
+        }
+        self.columns = columns
+        self.schema = pyarrow.schema([(name, types[kind]) for name, kind in columns])
+        super(ParquetWriter, self).__init__(path, batch_size=batch_size, **kwargs)
+        # the codec is applied by parquet, the file itself isn't compressed
+        self.compression = None
+
+    def open(self, path):
+        return pyarrow.parquet.ParquetWriter(path, self.schema, compression=self.codec)
+
+    def encode(self, item):
+        return flatten(item, self.columns)
+
+    def size(self, row):
+        return sum(len(v) if isinstance(v, (str, list)) else 8
+                   for v in row if v is not None)
+
+    def flush_batch(self):
+        if self.batch:
+            columns = list(zip(*self.batch))
+            self.fh.write_table(pyarrow.Table.from_arrays(
+                [pyarrow.array(c, type=f.type) for c, f in zip(columns, self.schema)],
+                schema=self.schema))
+            self.batch = []
+
+    def flush(self):
+        self.flush_batch()
+        self.flushed = time.time()
+
+    def tell(self):
+        return None
+
+    def close_file(self):
+        self.flush_batch()
+        self.fh.close()
+
+
+WRITERS = {
+    'json': JsonWriter,
+    'csv': CsvWriter,
+    'parquet': ParquetWriter
+}
+
+
+def open_writer(format, path=None, **kwargs):
+    """
+    A Writer for the given output format.
+    """
+    return WRITERS[format](path, **kwargs)
@@ -0,0 +1,100 @@
+"""
+Pace requests to stay inside the limits Gab reports in its response headers.
+"""
+import time
+import logging
+import threading
+
+
+def parse_reset(value, now=None):
+    """
+    Turn an X-RateLimit-Reset header into epoch seconds. Mastodon sends an
+    ISO 8601 timestamp, other servers send epoch seconds or seconds to wait.
+    """
+    now = time.time() if now is None else now
+    try:
+        seconds = float(value)
+    except ValueError:
+        from dateutil import parser as date_parser
+        return date_parser.parse(value).timestamp()
+    # a small number is a delay rather than a point in time
+    if seconds < 1e9:
+        return now + seconds
+    return seconds
+
+
+class RateLimiter(object):
+    """
+    A token bucket that is refilled from the X-RateLimit-Remaining and
+    X-RateLimit-Reset headers of every response. Requests are sent straight
+    away while there are more than reserve of them left in the window, and
+    wait for the window to reset once it is used up, so a crawl runs as
+    fast as it is allowed to without running into a 429. It is thread safe
+    and can be shared by concurrent fetchers.
+    """
+
+    def __init__(self, reserve=1, retry_wait=5):
+        self.reserve = reserve
+        self.retry_wait = retry_wait
+        self.remaining = None
+        self.reset = None
+        self.waited = 0
+        self.rate_limited = 0
+        self.lock = threading.Lock()
+
+    def wait(self):
+        """
+        Block until the next request may be sent.
+        """
+        with self.lock:
+            now = time.time()
+            if self.reset is None or now >= self.reset:
+                # the window is over, nothing is known until the next response
+                self.remaining = None
+                self.reset = None
+                delay = 0
+            elif self.remaining <= self.reserve:
+                delay = self.reset - now
+            else:
+                # taken from the bucket until the response refills it, so
+                # concurrent fetchers don't all spend the same request
+                self.remaining -= 1
+                delay = 0
+            self.waited += delay
+
+        if delay > 0:
+            if delay > 1:
+                logging.info("rate limit: waiting %.1f seconds", delay)
+            time.sleep(delay)
+
+    def update(self, response):
+        """
+        Refill the bucket from the rate limit headers of a response.
+        """
+        headers = response.headers
+        remaining = headers.get('X-RateLimit-Remaining')
+        reset = headers.get('X-RateLimit-Reset')
+        with self.lock:
+            now = time.time()
+            if remaining is not None and reset is not None:
+                try:
+                    self.remaining = int(remaining)
+                    self.reset = parse_reset(reset, now)
+                except (ValueError, OverflowError):
+                    logging.warn("unreadable rate limit headers %s %s", remaining, reset)
+            if response.status_code == 429:
+                retry_after = headers.get('Retry-After')
+                if retry_after is not None:
+                    try:
+                        self.reset = parse_reset(retry_after, now)
+                    except (ValueError, OverflowError):
+                        pass
+                if self.reset is None or self.reset <= now:
+                    self.reset = now + self.retry_wait
+                self.remaining = 0
+                self.rate_limited += 1
+                logging.warn("rate limited until %s", time.ctime(self.reset))
+
+    def stats(self):
+        with self.lock:
+            return {'rate_limited': self.rate_limited, 'wait_seconds': self.waited}
@@ -0,0 +1,108 @@
+"""
+Compact records holding only some of the fields of a status.
+"""
+
+
+def parse_fields(spec):
+    """
+    The field paths in a comma separated list such as
+    "id,created_at,account.acct".
+    """
+    fields = []
+    for field in spec.split(','):
+        field = field.strip()
+        if field and field not in fields:
+            fields.append(field)
+    if not fields:
+        raise ValueError("no fields in %r" % spec)
+    return fields
+
+
+def lookup(value, parts):
+    """
+    The value at a path of keys in a status. Lists along the way give a
+    list of the values in each of their items, so tags.name is the names
+    of the tags.
+    """
+    for i, part in enumerate(parts):
+        if isinstance(value, dict):
+            value = value.get(part)
+        elif isinstance(value, list):
+            return [v for v in (lookup(item, parts[i:]) for item in value) if v is not None]
+        else:
+            return None
+    return value
+
+
+class Record(object):
+    """
+    The base of the classes made by record_type. A record keeps the value
+    of each of its fields in a slot instead of a dictionary, and can be
+    read like the status it came from: record['account.acct'],
+    record.get('id'). Setting a field that isn't kept does nothing.
+    """
+
+    __slots__ = ()
+    fields = ()
+    slots = {}
+    paths = ()
+    nested = ()
+
+    @classmethod
+    def from_status(cls, status):
+        record = cls.__new__(cls)
+        for slot, parts in cls.paths:
+            setattr(record, slot, lookup(status, parts))
+        return record
+
+    def __getitem__(self, field):
+        return getattr(self, self.slots[field])
+
+    def __setitem__(self, field, value):
+        slot = self.slots.get(field)
+        if slot:
+            setattr(self, slot, value)
+
+    def __contains__(self, field):
+        return field in self.slots
+
+    def get(self, field, default=None):
+        slot = self.slots.get(field)
+        return getattr(self, slot) if slot else default
+
+    def as_dict(self):
+        """
+        The fields as a status shaped dictionary, with account.acct
+        under {"account": {"acct": ...}}.
+        """
+        item = {}
+        for slot, parts in self.nested:
+            parent = item
+            for part in parts[:-1]:
+                parent = parent.setdefault(part, {})
+            parent[parts[-1]] = getattr(self, slot)
+        return item
+
+    def __repr__(self):
+        return '%s(%r)' % (self.__class__.__name__, self.as_dict())
+
+
+def record_type(fields, hidden=()):
+    """
+    A Record class keeping the given field paths. The hidden ones can be
+    read but are left out of as_dict(), and so out of the output.
+    """
+    fields = tuple(fields)
+    slots = tuple('f%s' % i for i in range(len(fields)))
+    paths = tuple(zip(slots, [tuple(f.split('.')) for f in fields]))
+    # account.acct is already in the output when account is
+    nested = tuple((slot, parts) for slot, parts in paths
+                   if '.'.join(parts) not in hidden and
+                   not any('.'.join(parts[:i]) in fields for i in range(1, len(parts))))
+    return type('Post', (Record,), {
+        '__slots__': slots,
+        'fields': fields,
+        'slots': dict(zip(fields, slots)),
+        'paths': paths,
+        'nested': nested
+    })
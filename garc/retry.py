@@ -0,0 +1,80 @@
+"""
+Bounded retries with exponential backoff for requests to Gab.
+"""
+import time
+import random
+import logging
+import threading
+
+
+class RetryPolicy(object):
+    """
+    Retry a request in a loop with exponential backoff and jitter.
+
+    Responses with a status in retry_statuses are retried up to http_errors
+    times, connection errors and timeouts up to connection_errors times.
+    Any other status, a 404 for instance, is returned straight away. 429s
+    are retried without a backoff since the rate limiter already waits for
+    the limit to reset. When the retries run out the last response is
+    returned, or the last connection error raised.
+    """
+
+    def __init__(self, connection_errors=5, http_errors=5, backoff=2,
+                 max_backoff=120, retry_statuses=(429, 500, 502, 503, 504)):
+        self.connection_errors = connection_errors
+        self.http_errors = http_errors
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.retry_statuses = set(retry_statuses)
+        self.retries = 0
+        self.backoff_seconds = 0
+        self.lock = threading.Lock()
+
+    def call(self, request):
+        """
+        Call request() until it returns a response that should not be
+        retried or the retries run out.
+        """
+        import requests
+        http_errors = 0
+        connection_errors = 0
+        while True:
+            try:
+                r = request()
+            except (requests.exceptions.ConnectionError,
+                    requests.exceptions.Timeout) as e:
+                connection_errors += 1
+                if connection_errors > self.connection_errors:
+                    logging.error("giving up after %s connection errors", connection_errors)
+                    raise
+                logging.warn("Connection Error from Gab API! trying again: %s", e)
+                self.sleep(connection_errors)
+                continue
+
+            if r.status_code not in self.retry_statuses:
+                return r
+            http_errors += 1
+            if http_errors > self.http_errors:
+                logging.error("giving up on %s after %s http errors", r.url, http_errors)
+                return r
+            logging.warn("%s from Gab API! trying again", r.status_code)
+            self.sleep(0 if r.status_code == 429 else http_errors)
+
+    def sleep(self, attempt):
+        """
+        Count a retry and back off exponentially, with jitter so that
+        concurrent fetchers don't retry in lock step.
+        """
+        delay = 0
+        if attempt:
+            delay = min(self.backoff * 2 ** (attempt - 1), self.max_backoff)
+            delay = delay / 2.0 + random.uniform(0, delay / 2.0)
+        with self.lock:
+            self.retries += 1
+            self.backoff_seconds += delay
+        if delay:
+            time.sleep(delay)
+
+    def stats(self):
+        with self.lock:
+            return {'retries': self.retries, 'backoff_seconds': self.backoff_seconds}
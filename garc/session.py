@@ -0,0 +1,105 @@
+"""
+Pooled keep-alive HTTP sessions used by Garc for every request.
+"""
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+try:
+    from http import cookiejar
+except ImportError:
+    import cookielib as cookiejar
+
+
+def _counting_pool(base, adapter):
+    """
+    Subclass a urllib3 connection pool so that every connection it hands
+    out is reported to the adapter, and every time one of its connections
+    opens a socket too. A pooled connection that the server has closed in
+    the meantime opens a new one when it is used.
+    """
+    class CountingConnection(base.ConnectionCls):
+        def connect(self):
+            super(CountingConnection, self).connect()
+            adapter.count_connection()
+
+    class CountingPool(base):
+        ConnectionCls = CountingConnection
+
+        def _get_conn(self, timeout=None):
+            conn = super(CountingPool, self)._get_conn(timeout=timeout)
+            adapter.count_request()
+            return conn
+    return CountingPool
+
+
+class PooledAdapter(HTTPAdapter):
+    """
+    HTTPAdapter that counts how many requests went out over a reused
+    keep-alive connection and how many had to open a new one.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self.requests_sent = 0
+        self.connections_opened = 0
+        self._stats_lock = threading.Lock()
+        super(PooledAdapter, self).__init__(*args, **kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super(PooledAdapter, self).init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': _counting_pool(HTTPConnectionPool, self),
+            'https': _counting_pool(HTTPSConnectionPool, self)
+        }
+
+    def count_request(self):
+        with self._stats_lock:
+            self.requests_sent += 1
+
+    def count_connection(self):
+        with self._stats_lock:
+            self.connections_opened += 1
+
+    def stats(self):
+        with self._stats_lock:
+            return {
+                'requests': self.requests_sent,
+                'new_connections': self.connections_opened,
+                'reused_connections': self.requests_sent - self.connections_opened
+            }
+
+
+def new_session(pool_connections=10, pool_maxsize=10, keep_alive=True,
+                pool_block=False):
+    """
+    Create a requests Session with a connection pool mounted for http and
+    https. Cookies are never stored on the session itself, they are always
+    passed explicitly so that anonymous requests stay anonymous. With
+    pool_block requests wait for a free connection instead of opening more
+    than pool_maxsize connections to one host.
+    """
+    session = requests.Session()
+    adapter = PooledAdapter(pool_connections=pool_connections,
+                            pool_maxsize=pool_maxsize,
+                            pool_block=pool_block)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    session.cookies.set_policy(cookiejar.DefaultCookiePolicy(allowed_domains=[]))
+    if not keep_alive:
+        session.headers['Connection'] = 'close'
+    return session
+
+
+def connection_stats(session):
+    """
+    Sum the reused/new connection counters of every PooledAdapter mounted
+    on a session.
+    """
+    totals = {'requests': 0, 'new_connections': 0, 'reused_connections': 0}
+    adapters = set(a for a in session.adapters.values() if isinstance(a, PooledAdapter))
+    for adapter in adapters:
+        for key, value in adapter.stats().items():
+            totals[key] += value
+    return totals
@@ -0,0 +1,143 @@
+"""
+Collect one large timeline in parallel by splitting it into time ranges.
+"""
+import os
+import json
+import logging
+import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+from .window import parse_time
+from .output import open_writer
+from .checkpoint import CheckpointStore
+
+# Gab was launched in August 2016, nothing is older
+EARLIEST = '2016-08-01'
+
+
+def time_shards(after, before, shards):
+    """
+    Split the time from after to before into equal ranges, newest first,
+    as (after, before) pairs of ISO 8601 strings.
+    """
+    after = parse_time(after)
+    before = parse_time(before)
+    step = (before - after) / shards
+    bounds = [after + step * i for i in range(shards)] + [before]
+    return [(bounds[i].isoformat(), bounds[i + 1].isoformat())
+            for i in reversed(range(shards))]
+
+
+class ShardedCrawl(object):
+    """
+    Collect a timeline with method (Garc.search, userposts or
+    usercomments) as shards time ranges, each paged on its own from the
+    max_id of its upper bound, so that workers crawls run at once
+    instead of one long chain of requests. There are more shards than
+    workers so that busy and quiet periods even out.
+
+    Every shard is written to its own file next to the output
+    (output.shard-000, ...) with its own checkpoint, and the ranges are
+    kept in output.shards, so an interrupted crawl can be resumed. As
+    the ranges don't overlap, merged() combines the shards in order by
+    reading them one after the other, newest first.
+    """
+
+    def __init__(self, method, query, output, params, shards=16, workers=4,
+                 after=None, before=None, **kwargs):
+        self.method = method
+        self.query = query
+        self.output = output
+        self.params = params
+        self.shards = shards
+        self.workers = workers
+        self.after = after or EARLIEST
+        self.before = before or datetime.datetime.now(datetime.timezone.utc).isoformat()
+        self.kwargs = kwargs
+        self.plan_path = output + '.shards'
+        self.ranges = None
+
+    def shard_path(self, i):
+        return '%s.shard-%03d' % (self.output, i)
+
+    def plan(self, resume=False):
+        """
+        Split the crawl into ranges, or load the ranges of the crawl
+        being resumed.
+        """
+        if resume and os.path.isfile(self.plan_path):
+            with open(self.plan_path) as fh:
+                plan = json.load(fh)
+            if plan['params'] != self.params:
+                raise ValueError("shards %s were made with different parameters: %s"
+                                 % (self.plan_path, plan['params']))
+            self.ranges = plan['ranges']
+            logging.info("resuming %s shards from %s", len(self.ranges), self.plan_path)
+            return
+        self.ranges = time_shards(self.after, self.before, self.shards)
+        with open(self.plan_path, 'w') as fh:
+            json.dump({'params': self.params, 'ranges': self.ranges}, fh)
+        for i in range(len(self.ranges)):
+            for path in (self.shard_path(i), self.shard_path(i) + '.checkpoint'):
+                if os.path.isfile(path):
+                    os.remove(path)
+
+    def crawl_shard(self, i):
+        after, before = self.ranges[i]
+        path = self.shard_path(i)
+        checkpoints = CheckpointStore.for_output(path, {'shard': i, 'after': after, 'before': before})
+        if checkpoints.exists():
+            checkpoints.load()
+        if checkpoints.offset is not None:
+            with open(path, 'r+b') as partial:
+                partial.truncate(checkpoints.offset)
+            out = open_writer('json', path, append=True)
+        else:
+            out = open_writer('json', path)
+
+        def sync():
+            out.flush()
+            return out.tell()
+
+        checkpoints.sync = sync
+        logging.info("crawling shard %s of %s: %s to %s", i, self.query, after, before)
+        checkpoint = checkpoints.checkpoint(self.query)
+        for post in self.method(self.query, gabs_after=after, gabs_before=before,
+                                checkpoint=checkpoint, **self.kwargs):
+            out.write(post)
+        out.close()
+        if not checkpoint.done:
+            raise RuntimeError("stopped before the end of the range")
+        logging.info("finished shard %s of %s, %s gabs", i, self.query, out.items)
+
+    def crawl(self):
+        """
+        Crawl every shard, raising RuntimeError if any of them failed.
+        """
+        failed = []
+        with ThreadPoolExecutor(self.workers) as executor:
+            futures = [executor.submit(self.crawl_shard, i) for i in range(len(self.ranges))]
+            for i, future in enumerate(futures):
+                try:
+                    future.result()
+                except Exception as e:
+                    logging.error("shard %s of %s failed: %s", i, self.query, e)
+                    failed.append(i)
+        if failed:
+            raise RuntimeError("shards %s failed, use --resume to retry them"
+                               % ", ".join(map(str, failed)))
+
+    def merged(self):
+        """
+        Generator of the gabs of all the shards, newest first. The shard
+        files are removed once they have all been read.
+        """
+        for i in range(len(self.ranges)):
+            with open(self.shard_path(i), 'rb') as fh:
+                for line in fh:
+                    yield json.loads(line)
+        for i in range(len(self.ranges)):
+            for path in (self.shard_path(i), self.shard_path(i) + '.checkpoint'):
+                if os.path.isfile(path):
+                    os.remove(path)
+        os.remove(self.plan_path)
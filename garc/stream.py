@@ -0,0 +1,207 @@
+"""
+Live statuses from the Mastodon streaming API, with a polling fallback.
+"""
+import json
+import time
+import logging
+import collections
+
+import requests
+
+# streaming endpoint and the REST timeline polled in its place
+TIMELINES = {
+    'public': ('/api/v1/streaming/public', '/api/v1/timelines/public?limit=40'),
+    'hashtag': ('/api/v1/streaming/hashtag?tag=%s', '/api/v1/timelines/tag/%s?limit=40'),
+    'user': ('/api/v1/streaming/user', '/api/v1/timelines/home?limit=40')
+}
+
+
+def parse_sse(lines):
+    """
+    Turn the lines of a server-sent events stream into (event, data) pairs.
+    """
+    event = 'message'
+    data = []
+    for line in lines:
+        if isinstance(line, bytes):
+            line = line.decode('utf8')
+        if not line:
+            if data:
+                yield event, '\n'.join(data)
+            event = 'message'
+            data = []
+        elif line.startswith(':'):
+            # comments are sent as heartbeats
+            continue
+        else:
+            field, _, value = line.partition(':')
+            if value.startswith(' '):
+                value = value[1:]
+            if field == 'event':
+                event = value
+            elif field == 'data':
+                data.append(value)
+
+
+class StreamUnavailable(Exception):
+    """
+    The server does not offer a usable stream for a timeline.
+    """
+
+
+class Stream(object):
+    """
+    Follow a public, hashtag or user (home) timeline as statuses are
+    published. Statuses come from the server-sent events of the streaming
+    API, reconnecting with backoff when the connection drops and catching
+    up on anything missed in between from the REST timeline. When the
+    streaming API can't be used, the REST timeline is polled instead with
+    min_id, polling more often while statuses are coming in and less
+    often when it is quiet.
+    """
+
+    def __init__(self, garc, timeline='public', q=None, base_url=None,
+                 min_interval=2, max_interval=60, read_timeout=90):
+        if timeline not in TIMELINES:
+            raise ValueError("unknown timeline %s" % timeline)
+        self.garc = garc
+        self.timeline = timeline
+        stream_path, poll_path = TIMELINES[timeline]
+        if timeline == 'hashtag':
+            stream_path, poll_path = stream_path % q, poll_path % q
+        base_url = base_url or garc.base_url
+        self.stream_url = base_url + stream_path
+        self.poll_url = base_url + poll_path
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.read_timeout = read_timeout
+        self.last_id = None
+        self.recent = collections.deque(maxlen=1000)
+
+    def statuses(self):
+        """
+        Generator of new statuses, for as long as it is iterated.
+        """
+        try:
+            for status in self.streamed():
+                yield status
+        except StreamUnavailable as e:
+            logging.warn("streaming unavailable (%s), polling %s instead", e, self.poll_url)
+        for status in self.polled():
+            yield status
+
+    def streamed(self):
+        """
+        Statuses from the streaming API, reconnecting when it drops.
+        """
+        errors = 0
+        while True:
+            try:
+                resp = self.connect()
+                errors = 0
+                for event, data in parse_sse(resp.iter_lines()):
+                    if event == 'update':
+                        status = self.new(json.loads(data))
+                        if status:
+                            yield status
+                reason = "closed by server"
+            except (requests.exceptions.ConnectionError,
+                    requests.exceptions.Timeout,
+                    requests.exceptions.ChunkedEncodingError) as e:
+                reason = e
+            errors += 1
+            if errors > self.garc.retry_policy.connection_errors:
+                raise StreamUnavailable(reason)
+            logging.warn("stream %s dropped, reconnecting: %s", self.stream_url, reason)
+            self.garc.retry_policy.sleep(errors)
+            # fill the gap left while disconnected
+            for status in self.poll():
+                yield status
+
+    def connect(self):
+        """
+        Open the event stream.
+        """
+        cookies = None
+        if self.timeline == 'user':
+            if not self.garc.cookie:
+                self.garc.authenticate()
+            cookies = self.garc.cookie
+        self.garc.rate_limiter.wait()
+        logging.info("streaming %s", self.stream_url)
+        resp = self.garc.session.get(self.stream_url, stream=True, cookies=cookies,
+                                     headers=dict(self.garc.headers, Accept='text/event-stream'),
+                                     timeout=(self.garc.timeout, self.read_timeout))
+        content_type = resp.headers.get('Content-Type', '')
+        if resp.status_code != 200 or not content_type.startswith('text/event-stream'):
+            resp.close()
+            raise StreamUnavailable("%s %s" % (resp.status_code, content_type))
+        if self.last_id is None:
+            # start from the newest status so reconnects can catch up
+            self.poll(initial=True)
+        return resp
+
+    def polled(self):
+        """
+        Statuses from polling the REST timeline, adapting the interval to
+        how busy it is.
+        """
+        interval = self.min_interval
+        # after the stream was given up this catches up on what it missed
+        for status in self.poll(initial=self.last_id is None):
+            yield status
+        while True:
+            time.sleep(interval)
+            found = 0
+            for status in self.poll():
+                found += 1
+                yield status
+            if found:
+                interval = max(self.min_interval, interval / 2.0)
+            else:
+                interval = min(self.max_interval, interval * 2)
+
+    def poll(self, initial=False):
+        """
+        Statuses newer than the last one seen, oldest first, paging forward
+        with min_id. The initial poll only notes the newest status.
+        """
+        if initial or self.last_id is None:
+            posts = self.get(self.poll_url)
+            if posts:
+                self.last_id = max((p['id'] for p in posts), key=int)
+            return []
+        statuses = []
+        while True:
+            last_id = self.last_id
+            posts = self.get(self.poll_url + '&min_id=%s' % last_id)
+            if not posts:
+                break
+            for post in sorted(posts, key=lambda p: int(p['id'])):
+                status = self.new(post)
+                if status:
+                    statuses.append(status)
+            if self.last_id == last_id:
+                break
+        return statuses
+
+    def get(self, url):
+        if self.timeline == 'user':
+            resp = self.garc.get(url)
+        else:
+            resp = self.garc.anonymous_get(url)
+        if resp.status_code != 200:
+            logging.error("polling %s failed, recieved %s from Gab.com", url, resp.status_code)
+            return []
+        return resp.json()
+
+    def new(self, status):
+        """
+        Format a status unless it has been seen before.
+        """
+        if status['id'] in self.recent:
+            return None
+        self.recent.append(status['id'])
+        if self.last_id is None or int(status['id']) > int(self.last_id):
+            self.last_id = status['id']
+        return self.garc.format_post(status)
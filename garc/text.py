@@ -0,0 +1,105 @@
+"""
+Fast extraction of the plain text of a status from its HTML content.
+"""
+import html
+import functools
+from html.entities import html5
+from html.parser import HTMLParser
+
+# elements whose strings BeautifulSoup leaves out of get_text()
+HIDDEN_TAGS = frozenset(['script', 'style', 'template', 'rt', 'rp'])
+
+# elements inside which whitespace is kept as it is
+PRESERVE_TAGS = frozenset(['pre', 'textarea'])
+
+VOID_TAGS = frozenset([
+    'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'keygen',
+    'link', 'menuitem', 'meta', 'param', 'source', 'track', 'wbr', 'basefont',
+    'bgsound', 'command', 'frame', 'image', 'isindex', 'nextid', 'spacer'
+])
+
+ASCII_SPACES = frozenset('\x20\x0a\x09\x0c\x0d')
+
+
+class TextExtractor(HTMLParser):
+    """
+    A streaming HTMLParser that keeps only the text of a document. It gives
+    the same result as BeautifulSoup(markup, "html.parser").get_text()
+    without building a tree: comments, declarations and the strings of
+    script, style and template elements are left out, and strings of only
+    whitespace are collapsed to a single space or newline.
+    """
+
+    def __init__(self):
+        HTMLParser.__init__(self, convert_charrefs=False)
+        self.parts = []
+        self.data = []
+        self.stack = []
+
+    def text(self, markup):
+        self.feed(markup)
+        self.close()
+        self.end_data()
+        return ''.join(self.parts)
+
+    def end_data(self, cdata=False):
+        """
+        Finish the string collected since the last tag.
+        """
+        if not self.data:
+            return
+        data = ''.join(self.data)
+        self.data = []
+        # CDATA sections are kept even inside hidden elements
+        if not cdata and HIDDEN_TAGS.intersection(self.stack):
+            return
+        if not PRESERVE_TAGS.intersection(self.stack) and ASCII_SPACES.issuperset(data):
+            data = '\n' if '\n' in data else ' '
+        self.parts.append(data)
+
+    def handle_starttag(self, tag, attrs):
+        self.end_data()
+        if tag not in VOID_TAGS:
+            self.stack.append(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        self.end_data()
+
+    def handle_endtag(self, tag):
+        self.end_data()
+        if tag in self.stack:
+            while self.stack.pop() != tag:
+                pass
+
+    def handle_data(self, data):
+        self.data.append(data)
+
+    def handle_entityref(self, name):
+        self.data.append(html5.get(name + ';', '&' + name))
+
+    def handle_charref(self, name):
+        self.data.append(html.unescape('&#%s;' % name))
+
+    def handle_comment(self, data):
+        self.end_data()
+
+    def handle_decl(self, decl):
+        self.end_data()
+
+    def handle_pi(self, data):
+        self.end_data()
+
+    def unknown_decl(self, data):
+        self.end_data()
+        if data.upper().startswith('CDATA['):
+            self.data.append(data[6:])
+            self.end_data(cdata=True)
+
+
+@functools.lru_cache(maxsize=4096)
+def html_to_text(content):
+    """
+    The plain text of the HTML content of a status. Results are cached on
+    the raw content since reblogs and duplicate posts share it.
+    """
+    return TextExtractor().text(html.unescape(content))
@@ -0,0 +1,202 @@
+"""
+Expand collected gabs into the whole conversations they are part of.
+"""
+import logging
+import threading
+import collections
+from concurrent.futures import ThreadPoolExecutor
+
+
+class LRU(object):
+    """
+    A dictionary that forgets the least recently used keys past size.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self.items = collections.OrderedDict()
+
+    def get(self, key):
+        if key not in self.items:
+            return None
+        self.items.move_to_end(key)
+        return self.items[key]
+
+    def set(self, key, value):
+        self.items[key] = value
+        self.items.move_to_end(key)
+        if len(self.items) > self.size:
+            self.items.popitem(last=False)
+
+    def __contains__(self, key):
+        return key in self.items
+
+
+class ThreadExpander(object):
+    """
+    Replace every status that is part of a conversation by the whole
+    conversation: its root and all the replies below it, fetched from
+    /api/v1/statuses/:id/context. Conversations are returned together,
+    in id order, with each status carrying the id of the root in its
+    thread_root field.
+
+    Contexts are fetched by concurrency threads while statuses come in,
+    and the context of a root is kept in memory so that a conversation
+    shared by several statuses is only fetched once. Replies only fetch
+    their own context to find their root when the status they reply to
+    hasn't been seen in another context. A status that was
+    already returned as part of a conversation is skipped, and a reply
+    to one is returned on its own with the same thread_root.
+    """
+
+    def __init__(self, garc, concurrency=4, cache_size=100000):
+        self.garc = garc
+        self.concurrency = concurrency
+        self.roots = LRU(cache_size)
+        self.contexts = LRU(1000)
+        # the root of every status known to be in a conversation
+        self.ancestors = LRU(cache_size)
+        self.lock = threading.Lock()
+
+    def context(self, status_id):
+        """
+        The ancestors and descendants of a status, None if unavailable.
+        """
+        resp = self.garc.get(self.garc.base_url + "/api/v1/statuses/%s/context" % status_id)
+        if resp.status_code != 200:
+            logging.error("context of %s failed, recieved %s from Gab.com", status_id, resp.status_code)
+            return None
+        return resp.json()
+
+    def shared(self, cache, key, fetch):
+        """
+        The result of fetch() for key, kept in cache and fetched once
+        however many threads ask for it at the same time.
+        """
+        with self.lock:
+            entry = cache.get(key)
+            if entry is None:
+                entry = [threading.Event(), None]
+                cache.set(key, entry)
+                owner = True
+            else:
+                owner = False
+        if owner:
+            try:
+                entry[1] = fetch()
+            finally:
+                entry[0].set()
+        else:
+            entry[0].wait()
+        return entry[1]
+
+    def known(self, cache, key, value):
+        """
+        Put a result in cache that is already known, unless it is there.
+        """
+        with self.lock:
+            if key not in cache:
+                entry = [threading.Event(), value]
+                entry[0].set()
+                cache.set(key, entry)
+
+    def root_context(self, root_id):
+        """
+        The context of a conversation root, fetched once however many
+        threads ask for it at the same time.
+        """
+        return self.shared(self.contexts, root_id, lambda: self.context(root_id))
+
+    def root_of(self, status):
+        """
+        The root of the conversation of a reply, None if unavailable. The
+        context of the reply is only fetched when the status it replies
+        to isn't known yet, and all the ancestors it lists are recorded
+        so that replies to any of them don't need their own.
+        """
+        def fetch():
+            context = self.context(status['id'])
+            if not context or not context['ancestors']:
+                return None
+            root = context['ancestors'][0]
+            for ancestor in context['ancestors']:
+                self.known(self.ancestors, ancestor['id'], root)
+            return root
+
+        return self.shared(self.ancestors, status['in_reply_to_id'], fetch)
+
+    def thread(self, status):
+        """
+        The root of the conversation of a status and all its statuses.
+        """
+        root = status
+        if status.get('in_reply_to_id'):
+            root = self.root_of(status)
+            if root is None:
+                return status, [status]
+        elif not status.get('replies_count'):
+            return status, [status]
+        context = self.root_context(root['id'])
+        statuses = [root] + (context['descendants'] if context else [])
+        for descendant in statuses:
+            self.known(self.ancestors, descendant['id'], root)
+        if not any(s['id'] == status['id'] for s in statuses):
+            statuses.append(status)
+        return root, statuses
+
+    def expand(self, statuses):
+        """
+        Generator of the conversations of statuses.
+        """
+        executor = ThreadPoolExecutor(self.concurrency)
+        pending = collections.deque()
+        try:
+            for status in statuses:
+                if status['id'] in self.roots:
+                    continue
+                if status.get('in_reply_to_id') in self.roots:
+                    # a new reply in a conversation that was already expanded
+                    pending.append((status, None))
+                else:
+                    pending.append((status, executor.submit(self.thread, status)))
+                # look ahead a few statuses to keep the threads busy
+                while len(pending) > self.concurrency * 2 or (pending and ready(pending[0][1])):
+                    for post in self.emit(*pending.popleft()):
+                        yield post
+            while pending:
+                for post in self.emit(*pending.popleft()):
+                    yield post
+        finally:
+            for status, future in pending:
+                if future:
+                    future.cancel()
+            executor.shutdown(wait=False)
+
+    def emit(self, status, future):
+        """
+        The statuses of a conversation that weren't returned before.
+        """
+        if status['id'] in self.roots:
+            return []
+        if future is None:
+            root_id = self.roots.get(status.get('in_reply_to_id')) or status['id']
+            thread = [status]
+        else:
+            try:
+                root, thread = future.result()
+            except Exception as e:
+                logging.error("expanding the thread of %s failed: %s", status['id'], e)
+                root, thread = status, [status]
+            root_id = self.roots.get(root['id']) or root['id']
+        posts = []
+        for post in sorted(thread, key=lambda s: int(s['id'])):
+            if post['id'] in self.roots:
+                continue
+            self.roots.set(post['id'], root_id)
+            post['thread_root'] = root_id
+            posts.append(self.garc.format_post(post))
+        return posts
+
+
+def ready(future):
+    return future is None or future.done()
@@ -0,0 +1,94 @@
+"""
+Time windows for paginated crawls of timelines.
+"""
+import datetime
+
+
+def parse_time(value):
+    """
+    A timezone aware datetime from a datetime or a date string, taken to
+    be UTC when no timezone is given.
+    """
+    if isinstance(value, datetime.datetime):
+        dt = value
+    else:
+        from dateutil import parser as dateparser
+        dt = dateparser.parse(value)
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=datetime.timezone.utc)
+    return dt.astimezone(datetime.timezone.utc)
+
+
+def snowflake_id(dt):
+    """
+    The smallest Mastodon status id of a time. Ids are the milliseconds
+    since the epoch shifted left 16 bits, with a sequence in the low bits.
+    """
+    return int(dt.timestamp() * 1000) << 16
+
+
+def created_at(dt):
+    """
+    A time formatted like the created_at of a status, so that the two can
+    be compared as strings.
+    """
+    return dt.strftime('%Y-%m-%dT%H:%M:%S.') + '%03dZ' % (dt.microsecond // 1000)
+
+
+class TimeWindow(object):
+    """
+    The gabs created from after up to (not including) before, either of
+    which can be None for no bound. The bounds are parsed once, and gabs
+    are compared by their created_at strings.
+
+    Timelines are paged newest first, so a crawl can start at max_id,
+    the id of the upper bound, instead of paging down to it, and stop
+    after the page whose oldest gab is older than the lower bound.
+    """
+
+    def __init__(self, after=None, before=None):
+        self.after = parse_time(after) if after else None
+        self.before = parse_time(before) if before else None
+        self.after_text = created_at(self.after) if self.after else None
+        self.before_text = created_at(self.before) if self.before else None
+        self.after_id = snowflake_id(self.after) if self.after else None
+
+    @classmethod
+    def last(cls, minutes):
+        """
+        The window of the last few minutes.
+        """
+        now = datetime.datetime.now(datetime.timezone.utc)
+        return cls(after=now - datetime.timedelta(minutes=minutes))
+
+    @property
+    def max_id(self):
+        """
+        The max_id to start paging from, '' for the newest page.
+        """
+        return str(snowflake_id(self.before)) if self.before else ''
+
+    def contains(self, post):
+        created = post['created_at']
+        if self.after_text and created < self.after_text:
+            return False
+        if self.before_text and created >= self.before_text:
+            return False
+        return True
+
+    def passed(self, posts):
+        """
+        True when a page of posts reaches back past the lower bound, so
+        the pages after it are all outside the window. The oldest post
+        has to be older by its id as well as by its created_at, as the
+        odd post comes back with a date out of order.
+        """
+        if not self.after_text or not posts:
+            return False
+        oldest = posts[-1]
+        if oldest['created_at'] >= self.after_text:
+            return False
+        try:
+            return int(oldest['id']) < self.after_id
+        except (TypeError, ValueError):
+            return True
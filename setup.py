@@ -7,15 +7,16 @@ from setuptools import setup
 __version__ = '2.0'
 
 
-with open("README.md") as f:
-    long_description = f.read()
+if __name__ == "__main__":
+    # only read when installing, not when setup.py is imported
+    with open("README.md") as f:
+        long_description = f.read()
 
-if sys.version_info[0] < 3:
-    dependencies = open(join('requirements', 'python2.txt')).read().split()
-else:
-    dependencies = open(join('requirements', 'python3.txt')).read().split()
+    if sys.version_info[0] < 3:
+        dependencies = open(join('requirements', 'python2.txt')).read().split()
+    else:
+        dependencies = open(join('requirements', 'python3.txt')).read().split()
 
-if __name__ == "__main__":
     setup(
         name='garc',
         version=__version__,
@@ -0,0 +1,53 @@
+"""
+The mock Gab server of the benchmarks, for tests of whole commands.
+"""
+import os
+import sys
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'benchmarks'))
+
+import mock_server
+
+CONFIG = """[main]
+user_account = test@example.com
+user_password = test
+"""
+
+
+@pytest.fixture
+def mock_gab():
+    """
+    A MockGab with 200 statuses in every timeline.
+    """
+    server = mock_server.MockGab(('127.0.0.1', 0), mock_server.read_statuses(), size=200)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def run_garc(mock_gab, tmp_path, monkeypatch):
+    """
+    Run the garc command with some arguments against mock_gab, in tmp_path.
+    """
+    monkeypatch.chdir(tmp_path)
+    with open('garc.ini', 'w') as fh:
+        fh.write(CONFIG)
+
+    def run(*args):
+        from garc import command
+        monkeypatch.setattr(sys, 'argv', ['garc'] + list(args) + [
+            '--base_url', mock_gab.url, '--config', 'garc.ini', '--no_item_log'])
+        try:
+            command.main()
+        except SystemExit as e:
+            return e.code
+        return None
+
+    return run
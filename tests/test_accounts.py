@@ -0,0 +1,31 @@
+"""
+Usernames and account ids.
+"""
+import zlib
+
+import pytest
+
+from garc.accounts import AccountResolver
+from garc.client import Garc
+
+
+@pytest.fixture
+def garc(mock_gab, tmp_path):
+    return Garc(user_account='a', user_password='b', config=str(tmp_path / 'garc.ini'),
+                base_url=mock_gab.url)
+
+
+def test_all_digit_usernames(garc):
+    assert garc.account_id('1776') == str(zlib.crc32(b'1776'))
+    assert garc.account_id('id:1776') == '1776'
+
+
+def test_resolve_ids(garc):
+    assert AccountResolver(garc).resolve(['1776', 'id:1776']) == {
+        '1776': str(zlib.crc32(b'1776')), 'id:1776': '1776'}
+
+
+def test_lookup_ids(garc):
+    account_id = garc.account_id('someone')
+    accounts = AccountResolver(garc).lookup(['id:%s' % account_id, 'someone', 'id:1'])
+    assert [a['username'] for a in accounts] == ['someone', 'someone']
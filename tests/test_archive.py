@@ -0,0 +1,23 @@
+"""
+The local archive of collected gabs.
+"""
+from garc.archive import Archive
+
+
+def status(status_id, content, **kwargs):
+    return dict({
+        'id': str(status_id),
+        'created_at': '2020-01-01T00:00:00.000Z',
+        'content': content,
+        'account': {'id': '1', 'acct': 'someone'}
+    }, **kwargs)
+
+
+def test_statuses_without_body_are_searchable(tmp_path):
+    # top returns statuses without the body added by format_post
+    archive = Archive(str(tmp_path / 'gabs.db'))
+    archive.write(status(1, '<p>free <b>speech</b></p>'))
+    archive.write(status(2, '<p>speech</p>', body='speech'))
+    archive.commit()
+    assert sorted(s['id'] for s in archive.query(text='speech')) == ['1', '2']
+    archive.close()
@@ -0,0 +1,42 @@
+"""
+The on-disk response cache.
+"""
+import pytest
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from garc.cache import ResponseCache
+
+URL = 'http://gab.test/api/v1/timelines/tag/cats?max_id='
+
+
+def response(status_code, body=b'', headers=None):
+    resp = requests.models.Response()
+    resp.status_code = status_code
+    resp.headers = CaseInsensitiveDict(headers or {})
+    resp._content = body
+    return resp
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = ResponseCache(str(tmp_path / 'cache.db'))
+    yield cache
+    cache.close()
+
+
+def test_not_modified_is_answered_from_the_cache(cache):
+    sent = []
+    first = response(200, b'[1]', {'ETag': '"a"'})
+    assert cache.fetch(URL, lambda headers: sent.append(headers) or first).content == b'[1]'
+    # the newest page of a timeline has a ttl of 0 and is revalidated
+    resp = cache.fetch(URL, lambda headers: sent.append(headers) or response(304))
+    assert resp.status_code == 200 and resp.content == b'[1]'
+    assert sent == [{}, {'If-None-Match': '"a"'}]
+    assert cache.stats() == {'hits': 0, 'revalidated': 1, 'misses': 1}
+
+
+def test_fresh_responses_are_not_fetched_again(cache):
+    url = 'http://gab.test/api/v1/accounts/1'
+    cache.fetch(url, lambda headers: response(200, b'{}'))
+    assert cache.fetch(url, lambda headers: pytest.fail("fetched again")).content == b'{}'
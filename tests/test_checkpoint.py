@@ -0,0 +1,20 @@
+"""
+Checkpoints and high-water marks on disk.
+"""
+import json
+
+from garc.checkpoint import HighWaterMarks
+
+
+def test_overlapping_runs_keep_each_others_marks(tmp_path):
+    path = str(tmp_path / 'state.json')
+    with open(path, 'w') as fh:
+        json.dump({'search:foo': '5', 'search:bar': '5'}, fh)
+    first = HighWaterMarks(path, 'search')
+    second = HighWaterMarks(path, 'search')
+    first.mark('foo').advance('10')
+    second.mark('bar').advance('20')
+    # an older mark doesn't move the file back
+    second.mark('foo').advance('7')
+    with open(path) as fh:
+        assert json.load(fh) == {'search:foo': '10', 'search:bar': '20'}
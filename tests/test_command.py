@@ -0,0 +1,63 @@
+"""
+Options and queries of the garc command, and the messages it exits with.
+"""
+import os
+import json
+
+
+def test_invalid_search_term(run_garc):
+    code = run_garc('publicsearch', '(unclosed', '--output', 'posts.json')
+    assert code.startswith('invalid search term (unclosed')
+    assert not os.path.exists('posts.json')
+
+
+def test_invalid_dates(run_garc):
+    for date in ('bogus', '2999-99-99'):
+        code = run_garc('search', 'foo', '--output', 'posts.json', '--gabs_after', date)
+        assert code.startswith('invalid --gabs_after or --gabs_before')
+    assert not os.path.exists('posts.json')
+
+
+def test_unknown_account(run_garc):
+    code = run_garc('userposts', 'no-such', '--output', 'posts.json')
+    assert code.startswith('no account no-such')
+
+
+def test_unknown_account_followers(run_garc):
+    code = run_garc('followers', 'no-such', '--output', 'accounts.json')
+    assert code.startswith('no account no-such')
+
+
+def test_failed_followers(run_garc):
+    code = run_garc('following', 'id:1', '--output', 'accounts.json', '--http_errors', '1')
+    assert code.startswith('collecting following of 1 failed')
+
+
+def test_csv_of_accounts(run_garc):
+    code = run_garc('users', 'someone', '--format', 'csv')
+    assert code.startswith('--format csv works with: search')
+
+
+def test_fanout_line_without_term(run_garc):
+    with open('fanout.txt', 'w') as fh:
+        fh.write('cats.json cat\n\ndogs.json\n')
+    code = run_garc('publicsearch', '--fanout', 'fanout.txt')
+    assert code == 'fanout.txt line 3: expected an output file and a search term'
+
+
+def test_publicsearch_terms_keep_their_at(monkeypatch, run_garc):
+    from garc.client import Garc
+    terms = []
+    monkeypatch.setattr(Garc, 'public_search', lambda self, q, **kwargs: terms.extend(q) or [])
+    with open('terms.txt', 'w') as fh:
+        fh.write('@someone\nthe\n')
+    run_garc('publicsearch', '--from-file', 'terms.txt')
+    assert terms == ['@someone', 'the']
+
+
+def test_fields_with_expanded_threads(run_garc):
+    run_garc('search', 'foo', '--number_gabs', '20', '--fields', 'id,account.acct,body',
+             '--expand-threads', '--output', 'posts.json')
+    with open('posts.json') as fh:
+        keys = set(tuple(sorted(json.loads(line))) for line in fh)
+    assert keys == set([('account', 'body', 'id', 'thread_root')])
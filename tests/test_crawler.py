@@ -0,0 +1,24 @@
+"""
+Merging timelines with the AsyncCrawler.
+"""
+import threading
+
+from garc.crawler import AsyncCrawler
+
+
+def test_posts_are_passed_on_while_the_timeline_is_crawled():
+    consumed = threading.Event()
+    waited = []
+
+    def timeline(q):
+        yield 1
+        # the crawl only gets on once the first post has been handed out
+        waited.append(consumed.wait(2))
+        yield 2
+
+    crawler = AsyncCrawler(None)
+    posts = crawler.run(crawler.timelines(timeline, ['a'], {}))
+    assert next(posts) == 1
+    consumed.set()
+    assert list(posts) == [2]
+    assert waited == [True]
@@ -0,0 +1,82 @@
+"""
+Follower graph crawls against an in-memory follower graph.
+"""
+import pytest
+
+from garc.graph import GraphCrawler
+
+# follower, followed
+FOLLOWS = [(1, 2), (2, 1), (1, 3), (3, 2), (4, 1), (2, 5)]
+
+
+class Metrics(object):
+
+    def count(self, name, n=1):
+        pass
+
+
+class FakeGarc(object):
+
+    metrics = Metrics()
+
+    def account_id(self, q):
+        return q[3:]
+
+    def connections(self, account_id, relation):
+        for follower, followed in FOLLOWS:
+            if relation == 'following' and follower == account_id:
+                yield {'id': str(followed)}
+            elif relation == 'followers' and followed == account_id:
+                yield {'id': str(follower)}
+
+
+def crawl(tmp_path, relations, depth):
+    output = str(tmp_path / 'edges.txt')
+    crawler = GraphCrawler(FakeGarc(), output, relations=relations, depth=depth)
+    crawler.open(['id:1'])
+    crawler.crawl()
+    crawler.close()
+    with open(output) as fh:
+        return [tuple(int(i) for i in line.split()) for line in fh]
+
+
+def test_following(tmp_path):
+    assert sorted(crawl(tmp_path, ['following'], 2)) == [(1, 2), (1, 3), (2, 1), (2, 5), (3, 2)]
+
+
+def test_both_relations_write_every_edge_once(tmp_path):
+    assert sorted(crawl(tmp_path, ['following', 'followers'], 3)) == sorted(FOLLOWS)
+
+
+class FailingGarc(FakeGarc):
+
+    fail = set([3])
+
+    def connections(self, account_id, relation):
+        if account_id in self.fail:
+            raise ValueError("collecting %s of %s failed" % (relation, account_id))
+        return FakeGarc.connections(self, account_id, relation)
+
+
+def test_failed_accounts_are_retried_on_resume(tmp_path):
+    output = str(tmp_path / 'edges.txt')
+    garc = FailingGarc()
+    crawler = GraphCrawler(garc, output, depth=2)
+    crawler.open(['id:1'])
+    crawler.crawl()
+    crawler.close()
+    garc.fail = set()
+    crawler = GraphCrawler(garc, output, depth=2)
+    crawler.open(['id:1'], resume=True)
+    crawler.crawl()
+    crawler.close()
+    with open(output) as fh:
+        assert sorted(tuple(int(i) for i in line.split()) for line in fh) == [(1, 2), (1, 3), (2, 1), (2, 5), (3, 2)]
+
+
+def test_failed_page_raises(mock_gab, tmp_path):
+    from garc.client import Garc
+    garc = Garc(user_account='a', user_password='b', config=str(tmp_path / 'garc.ini'),
+                base_url=mock_gab.url, http_errors=1)
+    with pytest.raises(ValueError):
+        list(garc.connections('1', 'following'))
@@ -0,0 +1,102 @@
+"""
+Signing in, and login cookies saved between runs.
+"""
+import os
+import stat
+import time
+
+import pytest
+from requests.cookies import RequestsCookieJar
+
+from garc.client import Garc, csrf_token
+from garc.cookies import CookieStore
+
+
+class Page(object):
+
+    def __init__(self, *chunks):
+        self.chunks = chunks
+        self.read = 0
+
+    def iter_content(self, size):
+        for chunk in self.chunks:
+            self.read += 1
+            yield chunk
+
+
+def jar(expires=None):
+    cookies = RequestsCookieJar()
+    cookies.set('_session_id', 'abc', domain='gab.com', path='/', expires=expires)
+    return cookies
+
+
+def test_csrf_token_split_across_chunks():
+    page = Page(b'<html><head><meta name="csrf-to', b'ken" content="a+b&amp;c/=">',
+                b'</head><body>', b'never read')
+    assert csrf_token(page) == 'a+b&c/='
+    assert page.read == 2
+
+
+def test_no_csrf_token_past_the_head():
+    page = Page(b'<html><head></head><body>', b'<meta name="csrf-token" content="x">')
+    assert csrf_token(page) is None
+    assert page.read == 1
+
+
+def test_saved_cookies(tmp_path):
+    store = CookieStore(str(tmp_path / 'garc.ini.main.cookies'))
+    store.save('someone', jar(time.time() + 3600))
+    assert stat.S_IMODE(os.stat(store.path).st_mode) == 0o600
+    assert store.load('someone').get('_session_id') == 'abc'
+    assert store.load('someone else') is None
+
+
+def test_expired_cookies(tmp_path):
+    store = CookieStore(str(tmp_path / 'garc.ini.main.cookies'))
+    store.save('someone', jar(time.time() - 1))
+    assert store.load('someone') is None
+
+
+@pytest.fixture
+def garc(mock_gab, tmp_path, monkeypatch):
+    """
+    A Garc signing in to mock_gab that counts its logins.
+    """
+    logins = []
+    login = Garc.login
+    monkeypatch.setattr(Garc, 'login', lambda self: logins.append(1) or login(self))
+
+    def make():
+        garc = Garc(user_account='a', user_password='b', config=str(tmp_path / 'garc.ini'),
+                    base_url=mock_gab.url)
+        garc.logins = logins
+        return garc
+
+    return make
+
+
+def test_saved_login_is_reused(garc):
+    first = garc()
+    first.authenticate()
+    assert first.cookie.get('_session_id') == 'bench'
+    second = garc()
+    second.authenticate()
+    assert second.cookie.get('_session_id') == 'bench'
+    assert len(second.logins) == 1
+
+
+def test_rejected_login(garc):
+    g = garc()
+    g.authenticate()
+    rejected = g.cookie
+    # a cookie only just made wasn't rejected for being stale
+    g.authenticate(rejected=rejected)
+    assert len(g.logins) == 1
+    g.login_time -= 3600
+    g.authenticate(rejected=rejected)
+    assert len(g.logins) == 2
+    assert g.cookie is not rejected
+    # another thread has already signed in again
+    g.login_time -= 3600
+    g.authenticate(rejected=rejected)
+    assert len(g.logins) == 2
@@ -0,0 +1,24 @@
+"""
+Matching many search terms at once.
+"""
+from garc.matcher import Matcher
+
+
+def test_global_flags():
+    assert Matcher('(?i)the').match_text('THE end') == ['(?i)the']
+
+
+def test_backreferences_and_named_groups():
+    terms = ['b(c)', r'(a)\1', '(?P<x>q)', '(?P<x>r)']
+    assert Matcher(terms).match_text('aa r') == [r'(a)\1', '(?P<x>r)']
+
+
+def test_overlapping_and_prefix_terms():
+    terms = ['new', 'news', 'newsroom', 'room', 'ewsr']
+    assert Matcher(terms).match_text('the Newsroom') == terms
+
+
+def test_literal_and_regex_terms():
+    matcher = Matcher(['cat', 'd.g', 'b(ir)d'])
+    assert matcher.match_text('a dog and a cat') == ['cat', 'd.g']
+    assert matcher.match_text('a fish') == []
@@ -0,0 +1,50 @@
+"""
+Crawl metrics and their exports.
+"""
+from garc.metrics import Metrics, endpoint
+
+
+def metrics():
+    metrics = Metrics()
+    metrics.request('https://gab.com/api/v1/timelines/tag/cats?max_id=5', 0.02, 100, 200)
+    metrics.request('https://gab.com/api/v1/timelines/tag/dogs', 0.3, 50, 200)
+    metrics.request('https://gab.com/api/v1/timelines/tag/dogs', 0.04, 0, 429)
+    metrics.count('items', 40)
+    metrics.add_source('retries', lambda: {'retries': 1})
+    return metrics
+
+
+def test_endpoints():
+    assert endpoint('https://gab.com/api/v1/accounts/123/statuses?max_id=9') == \
+        '/api/v1/accounts/:id/statuses'
+    assert endpoint('https://gab.com/api/v1/account_by_username/someone') == \
+        '/api/v1/account_by_username/:username'
+
+
+def test_summary():
+    summary = metrics().summary()
+    assert summary['requests'] == 3
+    assert summary['rate_limited'] == 1
+    assert summary['bytes'] == 150
+    assert summary['items'] == 40
+    assert summary['retries'] == {'retries': 1}
+    tags = summary['endpoints']['/api/v1/timelines/tag/:tag']
+    assert tags['count'] == 3
+    assert tags['statuses'] == {'200': 2, '429': 1}
+    assert tags['p50'] == 0.05 and tags['p99'] == 0.5
+
+
+def test_prometheus():
+    lines = metrics().prometheus().splitlines()
+    tag = 'endpoint="/api/v1/timelines/tag/:tag"'
+    assert '# TYPE garc_request_duration_seconds histogram' in lines
+    # buckets are cumulative
+    assert 'garc_request_duration_seconds_bucket{%s,le="0.025"} 1' % tag in lines
+    assert 'garc_request_duration_seconds_bucket{%s,le="0.05"} 2' % tag in lines
+    assert 'garc_request_duration_seconds_bucket{%s,le="+Inf"} 3' % tag in lines
+    assert 'garc_request_duration_seconds_count{%s} 3' % tag in lines
+    assert 'garc_response_bytes_total{%s} 150' % tag in lines
+    assert 'garc_responses_total{%s,status="429"} 1' % tag in lines
+    assert '# TYPE garc_items_total counter' in lines
+    assert 'garc_items_total 40' in lines
+    assert 'garc_retries_retries 1' in lines
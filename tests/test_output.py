@@ -0,0 +1,33 @@
+"""
+Buffered output writers.
+"""
+import gzip
+import json
+
+from garc.output import JsonWriter
+
+
+def read(path, opener=open):
+    with opener(path, 'rb') as fh:
+        return [json.loads(line)['id'] for line in fh]
+
+
+def test_rotation_naming(tmp_path):
+    path = str(tmp_path / 'posts.json.gz')
+    writer = JsonWriter(path, rotate_items=2)
+    for i in range(5):
+        writer.write({'id': str(i)})
+    writer.close()
+    assert read(path, gzip.open) == ['0', '1']
+    assert read(str(tmp_path / 'posts-1.json.gz'), gzip.open) == ['2', '3']
+    assert read(str(tmp_path / 'posts-2.json.gz'), gzip.open) == ['4']
+
+
+def test_compression_from_the_extension(tmp_path):
+    path = str(tmp_path / 'posts.json.gz')
+    writer = JsonWriter(path)
+    writer.write({'id': '1'})
+    writer.close()
+    with open(path, 'rb') as fh:
+        assert fh.read(2) == b'\x1f\x8b'
+    assert read(path, gzip.open) == ['1']
@@ -0,0 +1,49 @@
+"""
+Pacing requests from the rate limit headers.
+"""
+import time
+
+import pytest
+
+from garc.ratelimit import RateLimiter
+
+
+class Response(object):
+
+    def __init__(self, remaining, reset, status_code=200):
+        self.headers = {'X-RateLimit-Remaining': str(remaining),
+                        'X-RateLimit-Reset': str(reset)}
+        self.status_code = status_code
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(time, 'sleep', sleeps.append)
+    return sleeps
+
+
+def test_no_waiting_while_requests_are_left(sleeps):
+    limiter = RateLimiter()
+    for remaining in range(299, 279, -1):
+        limiter.wait()
+        limiter.update(Response(remaining, 300))
+    assert sleeps == []
+
+
+def test_waiting_for_the_reset_when_used_up(sleeps):
+    limiter = RateLimiter()
+    limiter.update(Response(1, 60))
+    limiter.wait()
+    assert len(sleeps) == 1 and 59 < sleeps[0] <= 60
+
+
+def test_concurrent_requests_spend_the_bucket(sleeps):
+    # requests sent before any of their responses came back
+    limiter = RateLimiter()
+    limiter.update(Response(3, 60))
+    limiter.wait()
+    limiter.wait()
+    assert sleeps == []
+    limiter.wait()
+    assert len(sleeps) == 1
@@ -0,0 +1,32 @@
+"""
+Compact records of some fields of a status.
+"""
+from garc.record import parse_fields, record_type
+
+STATUS = {
+    'id': '1',
+    'content': '<p>hello</p>',
+    'account': {'id': '2', 'acct': 'someone', 'display_name': 'Someone'},
+    'tags': [{'name': 'cats'}, {'name': 'dogs'}]
+}
+
+
+def test_nested_projection():
+    Post = record_type(parse_fields('id, account.acct, tags.name'))
+    record = Post.from_status(STATUS)
+    assert record['account.acct'] == 'someone'
+    assert record['tags.name'] == ['cats', 'dogs']
+    assert record.as_dict() == {'id': '1', 'account': {'acct': 'someone'},
+                                'tags': {'name': ['cats', 'dogs']}}
+
+
+def test_fields_under_a_kept_field_are_not_repeated():
+    Post = record_type(['account', 'account.acct'])
+    assert Post.from_status(STATUS).as_dict() == {'account': STATUS['account']}
+
+
+def test_hidden_fields_are_not_written():
+    Post = record_type(['id', 'account.acct', 'in_reply_to_id'], hidden=['in_reply_to_id'])
+    record = Post.from_status(dict(STATUS, in_reply_to_id='7'))
+    assert record['in_reply_to_id'] == '7'
+    assert record.as_dict() == {'id': '1', 'account': {'acct': 'someone'}}
@@ -0,0 +1,81 @@
+"""
+Interrupted crawls resumed from their checkpoint.
+"""
+import datetime
+import json
+
+import pytest
+
+from garc import output
+from garc.matcher import Matcher
+from garc.window import TimeWindow
+
+
+def ids(path):
+    with open(path) as fh:
+        return [json.loads(line)['id'] for line in fh]
+
+
+def interrupted(run_garc, monkeypatch, n, *args):
+    """
+    Run garc exiting like ctrl-c does on the nth gab written.
+    """
+    write = output.Writer.write
+    written = [0]
+
+    def interrupt(self, item):
+        written[0] += 1
+        if written[0] == n:
+            raise SystemExit(0)
+        write(self, item)
+
+    with monkeypatch.context() as m:
+        m.setattr(output.Writer, 'write', interrupt)
+        run_garc(*args)
+
+
+def test_resume(run_garc, monkeypatch):
+    interrupted(run_garc, monkeypatch, 30, 'search', 'foo', '--output', 'posts.json')
+    run_garc('search', 'foo', '--output', 'posts.json', '--resume')
+    assert len(ids('posts.json')) == 200
+    assert len(set(ids('posts.json'))) == 200
+
+
+def test_resume_with_dedup(run_garc, monkeypatch):
+    # the gabs of the page being written when interrupted are fetched
+    # again, they mustn't be skipped as seen
+    interrupted(run_garc, monkeypatch, 30,
+                'search', 'foo', '--output', 'posts.json', '--dedup', 'seen.db')
+    run_garc('search', 'foo', '--output', 'posts.json', '--dedup', 'seen.db', '--resume')
+    assert sorted(ids('posts.json')) == sorted(set(ids('posts.json')))
+    assert len(ids('posts.json')) == 200
+
+    # and a later run finds them all in the index
+    run_garc('search', 'foo', '--output', 'again.json', '--dedup', 'seen.db')
+    assert ids('again.json') == []
+
+
+@pytest.mark.parametrize('query', [('foo',), ('--from-file', 'hashtags.txt')])
+def test_resume_incremental(run_garc, mock_gab, monkeypatch, query):
+    # a previous run collected up to the 100th newest gab
+    statuses = mock_gab.timeline.statuses
+    with open('state.json', 'w') as fh:
+        json.dump({'search:foo': statuses[99]['id']}, fh)
+    with open('hashtags.txt', 'w') as fh:
+        fh.write('foo\n')
+    args = ('search',) + query + ('--output', 'posts.json', '--incremental',
+                                  '--state_file', 'state.json')
+    interrupted(run_garc, monkeypatch, 30, *args)
+    run_garc(*(args + ('--resume',)))
+    assert sorted(ids('posts.json')) == sorted(s['id'] for s in statuses[:99])
+
+
+def test_resume_publicsearch(run_garc, mock_gab, monkeypatch):
+    # resumed once the last 20 minutes of the interrupted run are over
+    interrupted(run_garc, monkeypatch, 30, 'publicsearch', 'the', '--output', 'posts.json')
+    monkeypatch.setattr(TimeWindow, 'last', classmethod(
+        lambda cls, minutes: cls(after=datetime.datetime.now(datetime.timezone.utc))))
+    run_garc('publicsearch', 'the', '--output', 'posts.json', '--resume')
+    matcher = Matcher('the')
+    matches = [s['id'] for s in mock_gab.timeline.statuses if matcher.match(s)]
+    assert sorted(ids('posts.json')) == sorted(matches)
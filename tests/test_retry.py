@@ -0,0 +1,73 @@
+"""
+Retrying failed requests.
+"""
+import time
+
+import pytest
+import requests
+
+from garc.retry import RetryPolicy
+
+
+class Response(object):
+
+    url = 'http://gab.test/'
+
+    def __init__(self, status_code):
+        self.status_code = status_code
+
+
+def calls(results):
+    """
+    A request returning or raising each of results in turn, and the list
+    of its calls.
+    """
+    made = []
+
+    def request():
+        result = results[len(made)]
+        made.append(result)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    return request, made
+
+
+@pytest.fixture
+def policy():
+    policy = RetryPolicy(connection_errors=2, http_errors=2)
+    policy.sleep = lambda attempt: None
+    return policy
+
+
+def test_not_found_is_not_retried(policy):
+    request, made = calls([Response(404), Response(200)])
+    assert policy.call(request).status_code == 404
+    assert len(made) == 1
+
+
+def test_http_errors_are_retried_up_to_the_limit(policy):
+    request, made = calls([Response(500), Response(502), Response(503), Response(200)])
+    assert policy.call(request).status_code == 503
+    assert len(made) == 3
+
+
+def test_last_connection_error_is_raised(policy):
+    errors = [requests.exceptions.ConnectionError('first'),
+              requests.exceptions.Timeout('second'),
+              requests.exceptions.ConnectionError('last')]
+    request, made = calls(errors + [Response(200)])
+    with pytest.raises(requests.exceptions.ConnectionError, match='last'):
+        policy.call(request)
+    assert len(made) == 3
+
+
+def test_backoff_is_capped(monkeypatch):
+    delays = []
+    monkeypatch.setattr(time, 'sleep', delays.append)
+    policy = RetryPolicy(backoff=2, max_backoff=10)
+    for attempt in range(1, 8):
+        policy.sleep(attempt)
+    assert delays[0] <= 2
+    assert all(delay <= 10 for delay in delays)
@@ -0,0 +1,31 @@
+"""
+Pooled keep-alive connections.
+"""
+from garc.session import new_session, connection_stats
+
+
+def get(session, url, n):
+    for i in range(n):
+        session.get(url + '/api/v1/timelines/explore').content
+
+
+def test_keep_alive_connections_are_reused(mock_gab):
+    session = new_session()
+    assert connection_stats(session) == {'requests': 0, 'new_connections': 0,
+                                         'reused_connections': 0}
+    get(session, mock_gab.url, 5)
+    assert connection_stats(session) == {'requests': 5, 'new_connections': 1,
+                                         'reused_connections': 4}
+
+
+def test_without_keep_alive_every_request_connects(mock_gab):
+    session = new_session(keep_alive=False)
+    get(session, mock_gab.url, 3)
+    assert connection_stats(session) == {'requests': 3, 'new_connections': 3,
+                                         'reused_connections': 0}
+
+
+def test_cookies_are_not_kept(mock_gab):
+    session = new_session()
+    session.get(mock_gab.url + '/auth/sign_in').content
+    assert len(session.cookies) == 0
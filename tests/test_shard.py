@@ -0,0 +1,64 @@
+"""
+Timelines collected as shards of time.
+"""
+import datetime
+import json
+
+import pytest
+
+from garc.shard import ShardedCrawl
+from garc.window import TimeWindow
+
+START = datetime.datetime(2020, 1, 1, tzinfo=datetime.timezone.utc)
+
+# a gab every hour for four days, newest first
+TIMELINE = [{'id': str(i), 'created_at': (START + datetime.timedelta(hours=i)).strftime(
+    '%Y-%m-%dT%H:%M:%S.000Z')} for i in reversed(range(96))]
+
+
+class Timeline(object):
+    """
+    A paginator like Garc.search, failing once in the range of fail.
+    """
+
+    def __init__(self, fail=None):
+        self.fail = fail
+        self.crawled = 0
+
+    def __call__(self, q, gabs_after=None, gabs_before=None, checkpoint=None):
+        if checkpoint.done:
+            return
+        self.crawled += 1
+        window = TimeWindow(gabs_after, gabs_before)
+        posts = [post for post in TIMELINE if window.contains(post)]
+        for post in posts:
+            if self.fail == post['id']:
+                self.fail = None
+                raise IOError("connection lost")
+            yield post
+        checkpoint.page(posts[-1]['id'], len(posts), len(posts))
+        checkpoint.finish()
+
+
+def sharded(output, method, resume=False):
+    crawl = ShardedCrawl(method, 'cats', output, {'query': 'cats'}, shards=8, workers=3,
+                         after='2020-01-01', before='2020-01-05')
+    crawl.plan(resume=resume)
+    crawl.crawl()
+    return [post['id'] for post in crawl.merged()]
+
+
+def test_shards_are_merged_newest_first(tmp_path):
+    assert sharded(str(tmp_path / 'posts.json'), Timeline()) == [post['id'] for post in TIMELINE]
+
+
+def test_resuming_a_failed_shard(tmp_path):
+    output = str(tmp_path / 'posts.json')
+    method = Timeline(fail='40')
+    with pytest.raises(RuntimeError, match='shards 4 failed'):
+        sharded(output, method)
+    with open(output + '.shards') as fh:
+        assert len(json.load(fh)['ranges']) == 8
+    assert sharded(output, method, resume=True) == [post['id'] for post in TIMELINE]
+    # only the failed shard is crawled again
+    assert method.crawled == 9
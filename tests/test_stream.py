@@ -0,0 +1,133 @@
+"""
+Stream against a stand-in Mastodon server: its server-sent events endpoint
+sends a list of events per connection and then drops it, or answers 404
+once there are no more, and statuses are published to its REST timeline
+after a given number of requests to it.
+"""
+import json
+import signal
+import threading
+
+import pytest
+
+from garc.client import Garc
+from garc.stream import Stream, parse_sse
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+except ImportError:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+
+
+def status(status_id):
+    return {
+        'id': str(status_id),
+        'created_at': '2020-01-01T00:00:00.000Z',
+        'content': '<p>status %s</p>' % status_id,
+        'account': {'id': '1', 'acct': 'someone'}
+    }
+
+
+class Handler(BaseHTTPRequestHandler):
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        if self.path.startswith('/api/v1/streaming/public'):
+            if not server.events:
+                return self.send(404, b'{"error": "Not found"}', 'application/json')
+            body = b': heartbeat\n\n' + b''.join(
+                b'event: update\ndata: ' + json.dumps(status(i)).encode('utf8') + b'\n\n'
+                for i in server.events.pop(0))
+            return self.send(200, body, 'text/event-stream')
+        if self.path.startswith('/api/v1/timelines/public'):
+            min_id = 0
+            if 'min_id=' in self.path:
+                min_id = int(self.path.split('min_id=')[1].split('&')[0])
+            body = [status(i) for i in sorted(server.published, reverse=True) if i > min_id]
+            server.polls += 1
+            server.published += server.schedule.pop(server.polls, [])
+            return self.send(200, json.dumps(body[:40]).encode('utf8'), 'application/json')
+        self.send(404, b'{"error": "Not found"}', 'application/json')
+
+    def send(self, code, body, content_type):
+        self.send_response(code)
+        self.send_header('Content-Type', content_type)
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def server():
+    server = HTTPServer(('127.0.0.1', 0), Handler)
+    server.events = []
+    server.published = [99]
+    server.schedule = {}
+    server.polls = 0
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def statuses(server, tmp_path):
+    """
+    The statuses of a Stream of the public timeline, which fails the test
+    instead of waiting forever for one that never comes.
+    """
+    garc = Garc(user_account='a', user_password='b', config=str(tmp_path / 'garc.ini'),
+                base_url='http://%s:%s' % server.server_address[:2])
+    garc.retry_policy.sleep = lambda attempt: None
+
+    def timeout(signum, frame):
+        raise AssertionError("no status within 10 seconds")
+
+    previous = signal.signal(signal.SIGALRM, timeout)
+    signal.alarm(10)
+    yield Stream(garc, 'public', min_interval=0.01, max_interval=0.05).statuses()
+    signal.alarm(0)
+    signal.signal(signal.SIGALRM, previous)
+
+
+def take(statuses, n):
+    return [next(statuses)['id'] for i in range(n)]
+
+
+def test_parse_sse():
+    lines = [':thump', 'event: update', 'data: {"a":', 'data: 1}', '',
+             'event: delete', 'data: 5', '', 'data:x', '']
+    assert list(parse_sse(lines)) == [
+        ('update', '{"a":\n1}'), ('delete', '5'), ('message', 'x')]
+
+
+def test_streamed_updates(server, statuses):
+    server.events = [[100, 101]]
+    assert take(statuses, 2) == ['100', '101']
+
+
+def test_reconnect_catches_up(server, statuses):
+    server.events = [[100], [102], [103]]
+    # published while the stream was down, 102 is not repeated when the
+    # reconnected stream sends it
+    server.schedule = {1: [100, 101, 102]}
+    assert take(statuses, 4) == ['100', '101', '102', '103']
+
+
+def test_polling_after_stream_goes_away(server, statuses):
+    server.events = [[100]]
+    # 101 is caught up on after the stream drops, 102 is published after
+    # that and before the stream turns out to be gone for good
+    server.schedule = {1: [100, 101], 3: [102], 5: [103]}
+    assert take(statuses, 4) == ['100', '101', '102', '103']
+
+
+def test_polling_without_stream(server, statuses):
+    server.published = [99, 100]
+    # only what is published after the stream starts
+    server.schedule = {1: [101, 102]}
+    assert take(statuses, 2) == ['101', '102']
@@ -0,0 +1,38 @@
+"""
+The text of a status is what BeautifulSoup made of it.
+"""
+import html
+import json
+import os
+
+import pytest
+from bs4 import BeautifulSoup
+
+from garc.text import html_to_text
+
+FIXTURE = os.path.join(os.path.dirname(__file__), '..', 'benchmarks', 'fixtures', 'statuses.jsonl')
+
+MARKUP = [
+    '<p>Hello <a href="https://gab.com/tags/cats">#<span>cats</span></a> &amp; dogs</p>',
+    '<p>line one<br />line two</p>\n\n<p>  spaced   out  </p>',
+    '<p>&lt;script&gt;alert(1)&lt;/script&gt;</p><script>hidden()</script>',
+    '<pre>  kept\n   as is  </pre><!-- a comment --><p>&nbsp;&eacute;&#x1F600;&notanentity;</p>',
+    '<p>unclosed <b>bold <i>italic</p> after',
+    '',
+]
+
+
+def beautifulsoup(content):
+    return BeautifulSoup(html.unescape(content), features="html.parser").get_text()
+
+
+@pytest.mark.parametrize('content', MARKUP)
+def test_same_as_beautifulsoup(content):
+    assert html_to_text(content) == beautifulsoup(content)
+
+
+def test_fixture_same_as_beautifulsoup():
+    with open(FIXTURE) as fh:
+        posts = [json.loads(line) for line in fh if line.strip()]
+    for post in posts:
+        assert html_to_text(post['content']) == beautifulsoup(post['content']), post['id']
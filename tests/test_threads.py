@@ -0,0 +1,82 @@
+"""
+Expanding gabs into their conversations.
+"""
+from garc.threads import ThreadExpander
+
+# id: in_reply_to_id, 1 and 10 are roots
+THREADS = {1: None, 2: 1, 3: 2, 4: 2, 5: 1, 10: None, 11: 10}
+
+
+def status(status_id):
+    return {'id': str(status_id), 'in_reply_to_id': THREADS[status_id] and str(THREADS[status_id]),
+            'replies_count': sum(1 for parent in THREADS.values() if parent == status_id)}
+
+
+def ancestors(status_id):
+    parent = THREADS[status_id]
+    return ancestors(parent) + [status(parent)] if parent else []
+
+
+def descendants(status_id):
+    found = []
+    for child in sorted(THREADS):
+        if THREADS[child] == status_id:
+            found += [status(child)] + descendants(child)
+    return found
+
+
+class Response(object):
+
+    def __init__(self, status_code, body=None):
+        self.status_code = status_code
+        self.body = body
+
+    def json(self):
+        return self.body
+
+
+class FakeGarc(object):
+
+    base_url = 'http://gab.test'
+
+    def __init__(self, missing=()):
+        self.missing = missing
+        self.requests = []
+
+    def get(self, url):
+        self.requests.append(url)
+        status_id = int(url.split('/')[-2])
+        if status_id in self.missing:
+            return Response(404)
+        return Response(200, {'ancestors': ancestors(status_id),
+                              'descendants': descendants(status_id)})
+
+    def format_post(self, post):
+        return post
+
+
+def expand(garc, ids, concurrency=1):
+    posts = ThreadExpander(garc, concurrency=concurrency).expand(status(i) for i in ids)
+    return [(int(post['id']), int(post['thread_root'])) for post in posts]
+
+
+def test_statuses_are_grouped_by_root():
+    assert expand(FakeGarc(), [11, 3]) == [
+        (10, 10), (11, 10), (1, 1), (2, 1), (3, 1), (4, 1), (5, 1)]
+
+
+def test_statuses_returned_before_are_skipped():
+    assert expand(FakeGarc(), [3, 4, 1, 5]) == [(1, 1), (2, 1), (3, 1), (4, 1), (5, 1)]
+
+
+def test_replies_to_a_known_status_share_its_context():
+    garc = FakeGarc()
+    expander = ThreadExpander(garc)
+    assert expander.thread(status(3))[0]['id'] == '1'
+    assert expander.thread(status(4))[0]['id'] == '1'
+    assert [url.split('/')[-2] for url in garc.requests] == ['3', '1']
+
+
+def test_failed_context():
+    garc = FakeGarc(missing=(3, 10))
+    assert expand(garc, [3, 10]) == [(3, 3), (10, 10)]
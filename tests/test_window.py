@@ -0,0 +1,37 @@
+"""
+Time windows of paginated crawls.
+"""
+import datetime
+
+from garc.window import TimeWindow, snowflake_id
+
+
+def post(status_id, created_at):
+    return {'id': str(status_id), 'created_at': created_at}
+
+
+def test_max_id_seeks_to_the_upper_bound():
+    window = TimeWindow(before='2020-01-02')
+    before = datetime.datetime(2020, 1, 2, tzinfo=datetime.timezone.utc)
+    assert window.max_id == str(snowflake_id(before))
+    assert TimeWindow(after='2020-01-01').max_id == ''
+
+
+def test_contains():
+    window = TimeWindow('2020-01-01', '2020-01-02')
+    assert window.contains(post(1, '2020-01-01T00:00:00.000Z'))
+    assert not window.contains(post(1, '2020-01-02T00:00:00.000Z'))
+    assert not window.contains(post(1, '2019-12-31T23:59:59.999Z'))
+
+
+def test_passed_needs_the_oldest_post_before_by_date_and_id():
+    window = TimeWindow(after='2020-01-01')
+    inside = post(window.after_id + 1, '2020-01-01T10:00:00.000Z')
+    # the odd post comes back with a date out of order
+    misdated = post(window.after_id + 1, '2019-12-31T10:00:00.000Z')
+    older = post(window.after_id - 1, '2019-12-31T10:00:00.000Z')
+    assert not window.passed([inside])
+    assert not window.passed([inside, misdated])
+    assert window.passed([inside, older])
+    assert not window.passed([])
+    assert not TimeWindow().passed([older])